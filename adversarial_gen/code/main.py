@@ -6,11 +6,20 @@ sostituzione casuale di azioni nel piano originale. Gli attacchi vengono applica
 con diverse percentuali configurabili.
 """
 
-import random
 import os
+import re
 import pickle
-import json
-from typing import List, Tuple, Dict, Any
+import pickletools
+import traceback
+import functools
+import shutil
+import zlib
+import contextlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Tuple, Dict, Any, Sequence
+import numpy as np
+import orjson
 from unified_planning.shortcuts import *
 from tqdm import tqdm
 from up_utils import *
@@ -25,7 +34,6 @@ MASK_MODIFIED = 1  # Identificatore per azione modificata nella maschera
 BASE_PATH = './'
 DATA_DIR = f'{BASE_PATH}/data'
 CODE_DIR = f'{BASE_PATH}/code'
-TMP_DIR = f"{BASE_PATH}/tmp"
 
 # Percorsi Relativi Template
 DICTIONARIES_DIR_TEMPLATE = f'{DATA_DIR}/dictionaries/{{domain}}'
@@ -34,6 +42,7 @@ GOAL_DICTIONARY_FILE_TEMPLATE = f'{DICTIONARIES_DIR_TEMPLATE}/dizionario_goal'
 PLANS_DIR_TEMPLATE = f'{DATA_DIR}/{{domain}}'  # Directory dei piani da processare
 OUTPUT_DIR_TEMPLATE = f'{DATA_DIR}/validator_testset/prova/{{domain}}/{{hole_perc}}/'
 ERROR_DIR_TEMPLATE = f'{DATA_DIR}/validator_testset/errors/{{domain}}/{{hole_perc}}'
+GROUNDED_CACHE_DIR = f'{DATA_DIR}/grounded_cache'  # Azioni groundate persistenti tra esecuzioni
 
 # Configurazione Domini e Percentuali
 # DOMAINS = ['blocksworld', 'logistics', 'driverlog', 'satellite', 'depots', 'zenotravel']
@@ -41,27 +50,67 @@ DOMAINS = ['zenotravel']
 HOLE_PERCENTAGES = [10,30,50,70,100]  # Percentuali di "buchi" nei piani
 ATTACK_PERCENTAGES = [5, 15]  # Percentuali di azioni da attaccare
 
+# Estensioni degli archivi dei piani
+PLAN_SUFFIXES = ('.zip', '.tar.bz2')
+
 # Nome del Grounder
 GROUNDER_NAME = "fast-downward-reachability-grounder"
 
-# Imposta il seed per la riproducibilità degli esperimenti
-random.seed(RANDOM_SEED)
+# Versione del formato della cache su disco delle azioni groundate: va
+# incrementata a ogni modifica del filtro delle azioni (_ground_action_names
+# in up_utils), così le liste salvate in precedenza non vengono più lette
+_GROUNDED_CACHE_VERSION = 2
+
+# Opzioni di serializzazione JSON (chiavi intere e array NumPy ammessi)
+JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# Numero di processi worker per l'elaborazione parallela dei piani: la
+# variabile d'ambiente MASK_WORKERS lo sovrascrive (es. con più istanze in
+# parallelo, vedi run_masks_parallel.sh)
+NUM_WORKERS = int(os.environ.get('MASK_WORKERS', 0)) or psutil.cpu_count(logical=False) or os.cpu_count() or 1
+
+# Regex per estrarre i predicati tra parentesi dalla sezione :init
+_INIT_PRED_RE = re.compile(r'\(([^)]+)\)')
+
+# Regex (su byte, case insensitive) per individuare le sezioni del template
+_INIT_SECTION_RE = re.compile(rb'\(:init', re.IGNORECASE)
+_GOAL_SECTION_RE = re.compile(rb'\(:goal', re.IGNORECASE)
+
+# Generatore di numeri casuali con seed fisso, usato da adversarial_plan
+# quando non riceve un generatore; process_single_plan usa invece plan_rng
+_RNG = np.random.default_rng(RANDOM_SEED)
+
+# Cache delle azioni groundate (già in uppercase), indicizzata per firma del
+# problema: unica cache del processo per questo percorso (up_utils non ne
+# tiene una copia). Vive nei processi worker e viene svuotata a ogni cambio
+# di dominio.
+_grounded_cache: Dict[str, np.ndarray] = {}
+
+# Stato dei processi worker (dominio e dizionari correnti), aggiornato a
+# ogni cambio di dominio; il grounder è il singleton di up_utils.get_grounder
+_WORKER_STATE: Dict[str, Any] = {}
 
 
 def adversarial_plan(
     observations: List[str], 
     perc_actions: float, 
-    valid_actions: List[str]
+    valid_actions: Sequence[str],
+    rng: np.random.Generator = None
 ) -> Tuple[List[str], List[int], int]:
     """
     Applica un attacco avversariale a una sequenza di osservazioni sostituendo
     casualmente alcune azioni con azioni valide scelte random.
     
+    Le decisioni di attacco e gli indici delle azioni sostitutive vengono
+    estratti con due sole chiamate vettorizzate al generatore NumPy.
+    
     Args:
         observations: Lista delle azioni osservate nel piano originale
         perc_actions: Percentuale di azioni da modificare (0-100)
-        valid_actions: Lista delle azioni valide che possono essere utilizzate
-                      per la sostituzione
+        valid_actions: Azioni valide (già in uppercase) che possono essere
+                      utilizzate per la sostituzione (lista o array NumPy di
+                      tipo object)
+        rng: Generatore NumPy da usare; se None usa il generatore del modulo
     
     Returns:
         Tuple contenente:
@@ -71,31 +120,30 @@ def adversarial_plan(
     
     Example:
         >>> obs = ['action1', 'action2', 'action3']
-        >>> valid = ['action1', 'action2', 'action3', 'action4']
+        >>> valid = np.asarray(['ACTION1', 'ACTION2', 'ACTION3', 'ACTION4'], dtype=object)
         >>> new_obs, mask, count = adversarial_plan(obs, 50, valid)
         >>> # Circa il 50% delle azioni sarà sostituito
     """
-    # Seleziona casualmente gli indici delle azioni da modificare
-    indices_to_modify = []
-    for idx in range(len(observations)):
-        if random.random() < perc_actions / 100:
-            indices_to_modify.append(idx)
-
-    # Costruisce la nuova sequenza di osservazioni e la maschera
-    new_obs = []
-    mask = []
-    num_atks = len(indices_to_modify)
+    if rng is None:
+        rng = _RNG
     
-    for i, obs in enumerate(observations):
-        if i in indices_to_modify:
-            # Sostituisce l'azione originale con una casuale
-            action = random.choice(valid_actions)
-            new_obs.append(action.upper())
-            mask.append(MASK_MODIFIED)
-        else:
-            # Mantiene l'azione originale
-            new_obs.append(obs)
-            mask.append(MASK_ORIGINAL)
+    # Decide in un'unica estrazione quali osservazioni attaccare
+    attacked = rng.random(len(observations)) < perc_actions / 100
+    attacked_idx = np.flatnonzero(attacked)
+    num_atks = int(attacked_idx.size)
+    
+    # Estrae in blocco gli indici delle azioni sostitutive. Si estraggono
+    # indici e non le azioni: np.random.choice su una lista Python la
+    # convertirebbe in array a ogni chiamata, costo proporzionale al numero
+    # di azioni groundate
+    replacement_idx = rng.integers(0, len(valid_actions), size=num_atks, dtype=np.int64)
+    
+    # Costruisce la nuova sequenza sostituendo solo le posizioni attaccate
+    new_obs = list(observations)
+    for i, j in zip(attacked_idx.tolist(), replacement_idx.tolist()):
+        new_obs[i] = valid_actions[j]
+    
+    mask = np.where(attacked, MASK_MODIFIED, MASK_ORIGINAL).tolist()
     
     return new_obs, mask, num_atks
 
@@ -132,10 +180,15 @@ def adversarial_plan(observations, perc_actions, valid_actions):
 '''
 
 
+@functools.lru_cache(maxsize=32)
 def load_dictionary(dictionary_path: str) -> Dict[str, Any]:
     """
     Carica un dizionario serializzato da file pickle.
     
+    Il risultato è memorizzato in cache per percorso, quindi caricamenti
+    ripetuti dello stesso file non lo deserializzano di nuovo. Il dizionario
+    restituito è condiviso e non deve essere modificato.
+    
     Args:
         dictionary_path: Percorso del file pickle contenente il dizionario
     
@@ -150,6 +203,71 @@ def load_dictionary(dictionary_path: str) -> Dict[str, Any]:
         return pickle.load(f)
 
 
+def save_dictionary(dictionary: Dict[str, Any], dictionary_path: str) -> None:
+    """
+    Serializza un dizionario su file pickle con il protocollo più recente.
+    
+    Il pickle viene ottimizzato con pickletools.optimize, che rimuove le
+    istruzioni di memo inutilizzate: il file resta un pickle standard, più
+    piccolo e più veloce da caricare.
+    
+    Args:
+        dictionary: Dizionario da salvare
+        dictionary_path: Percorso del file pickle da creare
+    """
+    data = pickletools.optimize(pickle.dumps(dictionary, protocol=pickle.HIGHEST_PROTOCOL))
+    with open(dictionary_path, 'wb') as f:
+        f.write(data)
+    # Invalida la cache per evitare di restituire la versione precedente
+    load_dictionary.cache_clear()
+
+
+def normalize_dictionary(dictionary: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Restituisce una copia del dizionario con le chiavi in uppercase.
+    
+    Azioni groundate e stato iniziale vengono convertiti in uppercase una
+    sola volta per problema; normalizzando le chiavi al caricamento le
+    ricerche negli encoder non dipendono dal case con cui è stato salvato
+    il dizionario.
+    
+    Args:
+        dictionary: Dizionario {stringa: id_numerico}
+    
+    Returns:
+        Nuovo dizionario con le stesse associazioni e chiavi in uppercase
+    """
+    return {key.upper(): value for key, value in dictionary.items()}
+
+
+def _parse_init_state(content: bytes) -> List[str]:
+    """
+    Estrae i predicati dello stato iniziale dal contenuto di template.pddl.
+    
+    Args:
+        content: Contenuto in byte di template.pddl
+    
+    Returns:
+        Lista di predicati che descrivono lo stato iniziale
+    """
+    # Estrae la sezione tra (:init o (:INIT e (:goal o (:GOAL (case insensitive)
+    # cercando direttamente sui byte, senza copiare il file in lowercase
+    init_match = _INIT_SECTION_RE.search(content)
+    goal_match = _GOAL_SECTION_RE.search(content)
+    
+    if init_match is None or goal_match is None:
+        print(f"Warning: Could not find init or goal section in template.pddl")
+        return []
+    
+    # Decodifica solo la sezione, esclusa la parte "(:init" iniziale, e la
+    # converte in uppercase con un solo passaggio
+    init_section = content[init_match.end():goal_match.start()]
+    init_section = init_section.decode('ascii', errors='replace').strip().upper()
+    
+    # Estrae i predicati tra parentesi, ignorando quelli vuoti
+    return [clean for pred in _INIT_PRED_RE.findall(init_section) if (clean := pred.strip())]
+
+
 def get_init_state_safe(problem_dir: str) -> List[str]:
     """
     Estrae lo stato iniziale dal template PDDL in modo robusto.
@@ -162,46 +280,131 @@ def get_init_state_safe(problem_dir: str) -> List[str]:
         Lista di predicati che descrivono lo stato iniziale
     """
     try:
-        with open(problem_dir + '/template.pddl', 'r') as f:
-            content = f.read()
-            
-        # Estrae la sezione tra (:init o (:INIT e (:goal o (:goal (case insensitive)
-        content_lower = content.lower()
-        init_idx = content_lower.find('(:init')
-        goal_idx = content_lower.find('(:goal')
-        
-        if init_idx == -1 or goal_idx == -1:
-            print(f"Warning: Could not find init or goal section in template.pddl")
-            return []
-        
-        init_section = content[init_idx:goal_idx]
-        
-        # Rimuove la parte "(:init" o "(:INIT" dall'inizio
-        init_section = init_section[6:].strip()
-        
-        # Estrae tutti i predicati tra parentesi usando regex
-        import re
-        # Trova tutte le stringhe tra parentesi
-        predicates_raw = re.findall(r'\(([^)]+)\)', init_section)
-        
-        # Pulisce e converte in uppercase
-        result = []
-        for pred in predicates_raw:
-            pred_clean = pred.strip().upper()
-            if pred_clean:  # Ignora predicati vuoti
-                result.append(pred_clean)
-        
-        return result
+        with open(problem_dir + '/template.pddl', 'rb') as f:
+            return _parse_init_state(f.read())
         
     except Exception as e:
         # Se qualcosa va storto, ritorna lista vuota
         print(f"Warning: Could not parse init state from {problem_dir}: {e}")
-        import traceback
         traceback.print_exc()
         return []
 
 
-def save_error_info(plan_name: str, error: Exception, error_dir: str, tmp_path: str):
+def get_init_state_safe_from_bytes(files: Dict[str, bytes], plan_name: str = '') -> List[str]:
+    """
+    Come get_init_state_safe(), ma legge template.pddl dai file in memoria.
+    
+    Args:
+        files: Dizionario {nome_file: byte} restituito da extract_to_memory()
+        plan_name: Nome del piano, usato solo nei messaggi di warning
+    
+    Returns:
+        Lista di predicati che descrivono lo stato iniziale
+    """
+    try:
+        return _parse_init_state(files['template.pddl'])
+        
+    except Exception as e:
+        # Se qualcosa va storto, ritorna lista vuota
+        print(f"Warning: Could not parse init state from {plan_name}: {e}")
+        traceback.print_exc()
+        return []
+
+
+def get_problem_signature(files: Dict[str, bytes], pereira: bool = False) -> str:
+    """
+    Calcola una firma del problema a partire da domain.pddl e template.pddl.
+    
+    Piani diversi dello stesso problema condividono dominio e oggetti, quindi
+    anche le azioni groundate: la firma permette di eseguire il grounder solo
+    per i problemi non ancora visti.
+    
+    Args:
+        files: Dizionario {nome_file: byte} restituito da extract_to_memory()
+        pereira: Flag per dataset Pereira
+    
+    Returns:
+        Digest esadecimale (blake2b, 16 byte) dei file del problema
+    """
+    return grounding_signature(files['domain.pddl'], files['template.pddl'], pereira)
+
+
+def grounded_cache_dir() -> str:
+    """
+    Restituisce la directory della cache su disco delle azioni groundate.
+    
+    Il nome include la versione del formato (_GROUNDED_CACHE_VERSION) e il
+    grounder: cambiando filtro o grounder le liste salvate in precedenza
+    vengono ignorate invece di essere restituite non aggiornate.
+    
+    Returns:
+        Percorso della directory
+    """
+    return os.path.join(GROUNDED_CACHE_DIR, f'v{_GROUNDED_CACHE_VERSION}_{GROUNDER_NAME}')
+
+
+def get_valid_actions(files: Dict[str, bytes], grounder: Any, pereira: bool = False) -> np.ndarray:
+    """
+    Restituisce le azioni groundate del problema, convertite in uppercase.
+    
+    Le azioni vengono cercate prima nella cache del processo e poi nella
+    cache su disco, entrambe indicizzate per firma del problema; il grounder
+    viene eseguito solo per problemi mai visti, e il risultato viene salvato
+    per le esecuzioni successive. La cache su disco è separata per versione
+    del formato e nome del grounder (vedi grounded_cache_dir).
+    
+    Args:
+        files: Dizionario {nome_file: byte} restituito da extract_to_memory()
+        grounder: Compilatore per il grounding delle azioni
+        pereira: Flag per dataset Pereira
+    
+    Returns:
+        Array NumPy (dtype object) delle azioni groundate in uppercase
+    """
+    signature = get_problem_signature(files, pereira)
+    valid_actions = _grounded_cache.get(signature)
+    if valid_actions is not None:
+        return valid_actions
+    
+    cache_dir = grounded_cache_dir()
+    cache_file = os.path.join(cache_dir, f'{signature}.json')
+    try:
+        with open(cache_file, 'rb') as f:
+            actions = orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        actions = [a.upper() for a in get_grounded_actions_from_bytes(files, grounder, pereira)]
+        # Scrittura atomica: più worker possono salvare lo stesso problema
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+        with open(tmp_file, 'wb') as f:
+            f.write(orjson.dumps(actions))
+        os.replace(tmp_file, cache_file)
+    
+    valid_actions = np.asarray(actions, dtype=object)
+    _grounded_cache[signature] = valid_actions
+    return valid_actions
+
+
+def plan_rng(seed_key: str, attack_percentage: int) -> np.random.Generator:
+    """
+    Crea il generatore casuale di un piano per una percentuale di attacco.
+    
+    Il seed deriva da RANDOM_SEED, dalla chiave del piano e dalla percentuale:
+    la maschera di un piano non dipende dal worker che lo processa né dai
+    piani processati prima, quindi le esecuzioni sono riproducibili.
+    
+    Args:
+        seed_key: Chiave del piano (es. 'dominio/buchi/nome_piano')
+        attack_percentage: Percentuale di attacco
+    
+    Returns:
+        Generatore NumPy dedicato
+    """
+    spawn_key = (zlib.crc32(seed_key.encode()), attack_percentage)
+    return np.random.default_rng(np.random.SeedSequence(RANDOM_SEED, spawn_key=spawn_key))
+
+
+def save_error_info(plan_name: str, error: Exception, error_dir: str, archive_path: str):
     """
     Salva le informazioni di errore e i file del problema per il debug.
     
@@ -209,11 +412,9 @@ def save_error_info(plan_name: str, error: Exception, error_dir: str, tmp_path:
         plan_name: Nome del file del piano che ha causato l'errore
         error: L'eccezione che è stata sollevata
         error_dir: Directory dove salvare i file di errore
-        tmp_path: Directory temporanea dove sono stati estratti i file
+        archive_path: Percorso dell'archivio del problema, i cui file vengono
+                      estratti nella directory dell'errore
     """
-    import shutil
-    import traceback as tb
-    
     # Crea la directory degli errori se non esiste
     os.makedirs(error_dir, exist_ok=True)
     
@@ -229,20 +430,15 @@ def save_error_info(plan_name: str, error: Exception, error_dir: str, tmp_path:
         f.write(f"Error type: {type(error).__name__}\n")
         f.write(f"Error message: {str(error)}\n\n")
         f.write("Full traceback:\n")
-        f.write(tb.format_exc())
-    
-    # Copia i file estratti dalla directory temporanea
-    if os.path.exists(tmp_path):
-        for file in os.listdir(tmp_path):
-            src = os.path.join(tmp_path, file)
-            if os.path.isfile(src):
-                dst = os.path.join(problem_error_dir, file)
-                try:
-                    shutil.copy2(src, dst)
-                except Exception as copy_err:
-                    # Se la copia fallisce, salva almeno l'errore
-                    with open(error_file, 'a') as f:
-                        f.write(f"\nFailed to copy {file}: {copy_err}\n")
+        f.write(traceback.format_exc())
+    
+    # Estrae i file del problema accanto al report dell'errore
+    try:
+        open_compressed_file(archive_path, problem_error_dir)
+    except Exception as extract_err:
+        # Se l'estrazione fallisce, salva almeno l'errore
+        with open(error_file, 'a') as f:
+            f.write(f"\nFailed to extract {archive_path}: {extract_err}\n")
     
     print(f'  → Error info saved to: {problem_error_dir}')
 
@@ -250,223 +446,382 @@ def save_error_info(plan_name: str, error: Exception, error_dir: str, tmp_path:
 def process_single_plan(
     plan_name: str,
     plans_path: str,
-    tmp_path: str,
-    attack_percentage: float,
+    attack_percentages: List[int],
     grounder: Any,
     dizionario: Dict[str, Any],
-    dizionario_goal: Dict[str, Any]
-) -> Tuple[Dict[str, Any], int, int]:
+    dizionario_goal: Dict[str, Any],
+    seed_key: str = None
+) -> Tuple[Dict[int, Dict[str, Any]], Dict[int, int], int]:
     """
-    Processa un singolo piano applicando l'attacco avversariale.
+    Processa un singolo piano applicando l'attacco avversariale per ognuna
+    delle percentuali richieste.
+    
+    L'archivio del problema viene letto una sola volta in memoria e tutti i
+    dati vengono estratti dai byte, senza passare da una directory temporanea.
+    Lettura, grounding ed encoding di init e goal sono condivisi tra le
+    percentuali di attacco: per ognuna si ripetono solo l'attacco e
+    l'encoding delle osservazioni.
     
     Args:
         plan_name: Nome del file del piano da processare
         plans_path: Percorso della directory contenente i piani
-        tmp_path: Percorso della directory temporanea per l'estrazione
-        attack_percentage: Percentuale di azioni da modificare
+        attack_percentages: Percentuali di azioni da modificare
         grounder: Compilatore per il grounding delle azioni
         dizionario: Dizionario per l'encoding delle osservazioni
         dizionario_goal: Dizionario per l'encoding dei goal
+        seed_key: Chiave del piano per plan_rng (se None, il nome del piano)
     
     Returns:
         Tuple contenente:
-        - Dizionario con i dati del piano processato
-        - Numero di attacchi effettuati
+        - Dizionario {percentuale_attacco: dati del piano processato}
+        - Dizionario {percentuale_attacco: numero di attacchi effettuati}
         - Numero totale di osservazioni
     """
     # Determina se è un dataset Pereira
     is_pereira = plan_name.endswith('.tar.bz2')
     
+    # Un solo blocco try: la fase corrente viene tenuta in `stage` e
+    # riportata nel messaggio di errore
+    stage = 'opening compressed file'
     try:
-        # Estrae il problema dalla directory compressa
-        problem_dir = os.path.join(plans_path, plan_name)
-        open_compressed_file(problem_dir, tmp_path)
-    except Exception as e:
-        raise Exception(f"[{plan_name}] Error opening compressed file: {e}")
-    
-    try:
+        # Legge in memoria i file del problema compresso
+        files = extract_to_memory(os.path.join(plans_path, plan_name))
+        
         # Legge i dati del problema
-        observations = get_observations(tmp_path)
+        stage = 'getting observations'
+        observations = get_observations_from_bytes(files)
+        
+        stage = 'getting goals'
+        goals = get_goals_from_bytes(files, is_pereira)
+        
+        stage = 'getting real goal'
+        real_goal = get_real_goal_from_bytes(files, is_pereira)
+        
+        stage = 'getting init state'
+        init_state = get_init_state_safe_from_bytes(files, plan_name)
+        
+        # Ottiene le azioni valide per l'attacco
+        stage = 'getting grounded actions'
+        valid_actions = get_valid_actions(files, grounder, is_pereira)
+        
+        # Parte del risultato comune a tutte le percentuali di attacco
+        stage = 'encoding results'
+        encoded_init = encode_goal(init_state, dizionario_goal)
+        encoded_real_goal = encode_goal(real_goal, dizionario_goal)
+        encoded_goals = encode_goals(goals, dizionario_goal)
+        
+        results = {}
+        attacks = {}
+        for attack_percentage in attack_percentages:
+            # Applica l'attacco avversariale
+            stage = 'applying adversarial plan'
+            modified_obs, mask, num_attacks = adversarial_plan(
+                observations, 
+                attack_percentage, 
+                valid_actions,
+                plan_rng(seed_key or plan_name, attack_percentage)
+            )
+            
+            # Costruisce il risultato con i dati encoded
+            stage = 'encoding results'
+            results[attack_percentage] = {
+                'init_state': encoded_init,
+                'obs': encode_obs(modified_obs, dizionario),
+                'real_goal': encoded_real_goal,
+                'mask': mask,
+                'goals': encoded_goals
+            }
+            attacks[attack_percentage] = num_attacks
     except Exception as e:
-        raise Exception(f"[{plan_name}] Error getting observations: {e}")
+        raise Exception(f"[{plan_name}] Error {stage}: {e}") from e
     
-    try:
-        goals = get_goals(tmp_path, is_pereira)
-    except Exception as e:
-        raise Exception(f"[{plan_name}] Error getting goals: {e}")
+    return results, attacks, len(observations)
+
+
+def get_domain_dictionaries(domain: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Carica i dizionari delle azioni e dei goal di un dominio, con le chiavi
+    normalizzate in uppercase.
     
-    try:
-        real_goal = get_real_goal(tmp_path, is_pereira)
-    except Exception as e:
-        raise Exception(f"[{plan_name}] Error getting real goal: {e}")
+    Args:
+        domain: Nome del dominio
     
-    try:
-        init_state = get_init_state_safe(tmp_path)
-    except Exception as e:
-        raise Exception(f"[{plan_name}] Error getting init state: {e}")
+    Returns:
+        Tuple contenente il dizionario delle azioni e quello dei goal
+    """
+    dizionario = normalize_dictionary(load_dictionary(DICTIONARY_FILE_TEMPLATE.format(domain=domain)))
+    dizionario_goal = normalize_dictionary(load_dictionary(GOAL_DICTIONARY_FILE_TEMPLATE.format(domain=domain)))
+    return dizionario, dizionario_goal
+
+
+def _init_worker() -> None:
+    """
+    Inizializza un processo worker del pool.
     
-    try:
-        # Ottiene le azioni valide per l'attacco
-        valid_actions = get_grounded_actions(tmp_path, grounder, is_pereira)
-    except Exception as e:
-        raise Exception(f"[{plan_name}] Error getting grounded actions: {e}")
+    Il Compiler non è serializzabile, quindi ogni worker costruisce il proprio
+    grounder, una sola volta per tutta la vita del pool.
+    """
+    get_grounder(GROUNDER_NAME)
+
+
+def _set_worker_domain(domain: str) -> None:
+    """
+    Prepara il worker per un dominio: al primo piano di un nuovo dominio
+    carica i dizionari e svuota la cache delle azioni groundate.
+    
+    Args:
+        domain: Nome del dominio del piano da processare
+    """
+    if _WORKER_STATE.get('domain') == domain:
+        return
+    _grounded_cache.clear()
+    _WORKER_STATE['dizionario'], _WORKER_STATE['dizionario_goal'] = get_domain_dictionaries(domain)
+    _WORKER_STATE['domain'] = domain
+
+
+def create_executor(num_workers: int = None) -> ProcessPoolExecutor:
+    """
+    Crea il pool di processi usato per processare i piani.
+    
+    Il pool può essere condiviso tra più domini: ogni worker crea il proprio
+    grounder una sola volta. I seed non dipendono dal worker (vedi plan_rng).
+    
+    Args:
+        num_workers: Numero di processi; se None usa NUM_WORKERS
+    
+    Returns:
+        Il ProcessPoolExecutor, da usare come context manager
+    """
+    if num_workers is None:
+        num_workers = NUM_WORKERS
+    print(f'Using {num_workers} worker processes')
+    return ProcessPoolExecutor(
+        max_workers=num_workers,
+        initializer=_init_worker
+    )
+
+
+def _process_plan_task(
+    domain: str,
+    hole_perc: int,
+    plan_name: str,
+    plans_path: str,
+    attack_percentages: List[int],
+    error_dir: str,
+    shard_dirs: Dict[int, str]
+) -> Tuple[str, Dict[int, int], int, Any]:
+    """
+    Processa un piano all'interno di un processo worker.
+    
+    Il risultato di ogni percentuale di attacco viene scritto dal worker
+    stesso nel proprio file shard (shard_<pid>.jsonl nella directory degli
+    shard di quella percentuale), una riga "nome": {...} per piano, così al
+    processo principale tornano solo le statistiche. Gli errori vengono
+    salvati su disco direttamente dal worker, che ha ancora a disposizione
+    il traceback dell'eccezione.
+    
+    Args:
+        domain: Nome del dominio del piano
+        hole_perc: Percentuale di "buchi" dei piani, parte del seed del piano
+        plan_name: Nome del file del piano da processare
+        plans_path: Percorso della directory contenente i piani
+        attack_percentages: Percentuali di azioni da modificare
+        error_dir: Directory dove salvare i file di errore
+        shard_dirs: Dizionario {percentuale_attacco: directory degli shard}
     
+    Returns:
+        Tuple contenente:
+        - Nome del piano
+        - Dizionario {percentuale_attacco: numero di attacchi effettuati}
+        - Numero totale di osservazioni
+        - Messaggio di errore (None se il piano è stato processato)
+    """
     try:
-        # Applica l'attacco avversariale
-        modified_obs, mask, num_attacks = adversarial_plan(
-            observations, 
-            attack_percentage, 
-            valid_actions
+        _set_worker_domain(domain)
+        results, attacks, num_obs = process_single_plan(
+            plan_name,
+            plans_path,
+            attack_percentages,
+            get_grounder(GROUNDER_NAME),
+            _WORKER_STATE['dizionario'],
+            _WORKER_STATE['dizionario_goal'],
+            seed_key=f'{domain}/{hole_perc}/{plan_name}'
         )
     except Exception as e:
-        raise Exception(f"[{plan_name}] Error applying adversarial plan: {e}")
+        # Salva le informazioni di errore per il debug
+        save_error_info(plan_name, e, error_dir, os.path.join(plans_path, plan_name))
+        return plan_name, {}, 0, str(e)
+    
+    key = orjson.dumps(plan_name) + b':'
+    shard_name = f'shard_{os.getpid()}.jsonl'
+    for attack_perc, result in results.items():
+        with open(os.path.join(shard_dirs[attack_perc], shard_name), 'ab') as f:
+            f.write(key + orjson.dumps(result, option=JSON_OPTIONS) + b'\n')
+    return plan_name, attacks, num_obs, None
+
+
+def merge_shards(shard_dir: str, output_file: str) -> int:
+    """
+    Unisce i file shard scritti dai worker in un unico oggetto JSON
+    {nome_piano: risultato} e rimuove la directory degli shard.
     
-    try:
-        # Costruisce il risultato con i dati encoded
-        result = {
-            'init_state': encode_goal(init_state, dizionario_goal),
-            'obs': encode_obs(modified_obs, dizionario),
-            'real_goal': encode_goal(real_goal, dizionario_goal),
-            'mask': mask,
-            'goals': [encode_goal(goal, dizionario_goal) for goal in goals]
-        }
-    except Exception as e:
-        raise Exception(f"[{plan_name}] Error encoding results: {e}")
+    Le righe vengono copiate così come sono, senza deserializzarle.
+    
+    Args:
+        shard_dir: Directory contenente i file shard_*.jsonl
+        output_file: Percorso del file JSON da creare
     
-    return result, num_attacks, len(observations)
+    Returns:
+        Numero di piani scritti nel file di output
+    """
+    count = 0
+    with open(output_file, 'wb') as out:
+        out.write(b'{')
+        for entry in sorted(os.scandir(shard_dir), key=lambda e: e.name):
+            with open(entry.path, 'rb') as shard:
+                for line in shard:
+                    if count > 0:
+                        out.write(b',')
+                    out.write(line.rstrip(b'\n'))
+                    count += 1
+        out.write(b'}')
+    shutil.rmtree(shard_dir)
+    return count
 
 
 def process_domain(
     domain: str,
     hole_percentages: List[int],
-    attack_percentages: List[int]
+    attack_percentages: List[int],
+    executor: ProcessPoolExecutor = None
 ) -> None:
     """
     Processa un intero dominio applicando attacchi con diverse percentuali.
     
+    I piani di ogni configurazione vengono distribuiti su un pool di
+    processi (NUM_WORKERS, se l'executor non viene passato). Passando lo stesso executor a più chiamate, i
+    worker (e i loro grounder) vengono riutilizzati tra domini.
+    
     Args:
         domain: Nome del dominio (es. 'blocksworld', 'logistics')
         hole_percentages: Lista delle percentuali di "buchi" da processare
         attack_percentages: Lista delle percentuali di attacco da applicare
+        executor: Pool creato con create_executor(); se None ne viene creato
+                  uno per questo dominio
     """
     print(f'\n{"="*60}')
     print(f'Processing domain: {domain.upper()}')
     print(f'{"="*60}')
     
-    # Carica i dizionari del dominio usando i template
-    dictionary_file = DICTIONARY_FILE_TEMPLATE.format(domain=domain)
-    dizionario = load_dictionary(dictionary_file)
+    # Carica i dizionari del dominio: i worker li caricano a loro volta al
+    # primo piano del dominio, qui servono solo a verificarli
+    dizionario, dizionario_goal = get_domain_dictionaries(domain)
     print(f'Loaded action dictionary with {len(dizionario)} entries')
-    
-    goal_dictionary_path = GOAL_DICTIONARY_FILE_TEMPLATE.format(domain=domain)
-    dizionario_goal = load_dictionary(goal_dictionary_path)
     print(f'Loaded goal dictionary with {len(dizionario_goal)} entries')
     
-    # Inizializza il grounder
-    grounder = Compiler(name=GROUNDER_NAME)
-    
     # Dizionario per raccogliere le statistiche sugli attacchi
     attack_histogram = {}
     
-    # Itera su ogni percentuale di "buchi"
-    for hole_perc in hole_percentages:
-        print(f'\n--- Processing plans with {hole_perc}% observability ---')
-        attack_histogram[hole_perc] = {}
-        
-        # Percorso dei piani da processare per questa percentuale di "buchi"
-        plans_path = f'{PLANS_DIR_TEMPLATE.format(domain=domain)}/{hole_perc}'
-        
-        # Verifica che la directory esista
-        if not os.path.exists(plans_path):
-            print(f'WARNING: Directory {plans_path} does not exist. Skipping...')
-            continue
-        
-        # Itera su ogni percentuale di attacco
-        for attack_perc in attack_percentages:
-            print(f'\nApplying {attack_perc}% attack rate...')
+    # Percorso base dei piani del dominio
+    plans_base = PLANS_DIR_TEMPLATE.format(domain=domain)
+    
+    with (create_executor() if executor is None else contextlib.nullcontext(executor)) as executor:
+        # Itera su ogni percentuale di "buchi"
+        for hole_perc in hole_percentages:
+            print(f'\n--- Processing plans with {hole_perc}% observability ---')
+            attack_histogram[hole_perc] = {}
             
-            # Inizializza le strutture dati per questa configurazione
-            solutions_dict = {}
-            attack_histogram[hole_perc][attack_perc] = {}
+            # Percorso dei piani da processare per questa percentuale di "buchi"
+            plans_path = f'{plans_base}/{hole_perc}'
             
-            total_attacks = 0
-            total_observations = 0
-            error_count = 0
+            # Verifica che la directory esista
+            if not os.path.exists(plans_path):
+                print(f'WARNING: Directory {plans_path} does not exist. Skipping...')
+                continue
             
-            # Directory per salvare gli errori
+            # Directory di output e degli errori per questa percentuale di "buchi"
+            output_dir = OUTPUT_DIR_TEMPLATE.format(domain=domain, hole_perc=hole_perc)
+            os.makedirs(output_dir, exist_ok=True)
             error_dir = ERROR_DIR_TEMPLATE.format(domain=domain, hole_perc=hole_perc)
             
-            # Processa ogni piano nella directory
-            plan_files = [f for f in os.listdir(plans_path) 
-                         if f.endswith('.zip') or f.endswith('.tar.bz2')]
+            # I piani da processare sono gli stessi per ogni percentuale di attacco
+            plan_files = [entry.name for entry in os.scandir(plans_path)
+                          if entry.is_file() and entry.name.endswith(PLAN_SUFFIXES)]
             
             print(f'Found {len(plan_files)} plans to process.')
             
-            for plan_name in tqdm(plan_files, desc=f'{attack_perc}% attack'):
-                try:
-                    result, num_attacks, num_obs = process_single_plan(
-                        plan_name,
-                        plans_path,
-                        TMP_DIR,
-                        attack_perc,
-                        grounder,
-                        dizionario,
-                        dizionario_goal
-                    )
-                    
-                    solutions_dict[plan_name] = result
-                    total_attacks += num_attacks
-                    total_observations += num_obs
-                    
-                    # Aggiorna l'istogramma degli attacchi
-                    if num_attacks not in attack_histogram[hole_perc][attack_perc]:
-                        attack_histogram[hole_perc][attack_perc][num_attacks] = 0
-                    attack_histogram[hole_perc][attack_perc][num_attacks] += 1
-                    
-                except Exception as e:
-                    error_count += 1
-                    print(f'\n✗ Error processing {plan_name}: {str(e)}')
-                    
-                    # Salva le informazioni di errore per il debug
-                    save_error_info(plan_name, e, error_dir, TMP_DIR)
-                    continue
+            # Ogni worker scrive i propri risultati in un file shard per
+            # percentuale di attacco; gli shard vengono uniti al termine
+            shard_dirs = {}
+            for attack_perc in attack_percentages:
+                shard_dirs[attack_perc] = f'{output_dir}/.shards_{attack_perc}'
+                shutil.rmtree(shard_dirs[attack_perc], ignore_errors=True)
+                os.makedirs(shard_dirs[attack_perc])
             
-            # Calcola la percentuale effettiva di attacchi
-            if total_observations > 0:
-                actual_attack_perc = (total_attacks / total_observations) * 100
-                attack_histogram[hole_perc][attack_perc]["actual_atk_perc"] = actual_attack_perc
-                print(f'Actual attack percentage: {actual_attack_perc:.2f}%')
+            # Statistiche per ogni percentuale di attacco
+            histograms = {attack_perc: defaultdict(int) for attack_perc in attack_percentages}
+            total_attacks = dict.fromkeys(attack_percentages, 0)
+            total_observations = 0
+            error_count = 0
             
-            # Report errori
-            if error_count > 0:
-                print(f'⚠ {error_count} problems failed (see {error_dir} for details)')
-                attack_histogram[hole_perc][attack_perc]["errors"] = error_count
+            # Ogni piano viene letto e groundato una sola volta per tutte le
+            # percentuali di attacco
+            futures = [
+                executor.submit(_process_plan_task, domain, hole_perc, plan_name, plans_path, attack_percentages, error_dir, shard_dirs)
+                for plan_name in plan_files
+            ]
             
-            # Salva i risultati per questa configurazione usando il template
-            output_dir = OUTPUT_DIR_TEMPLATE.format(domain=domain, hole_perc=hole_perc)
-            os.makedirs(output_dir, exist_ok=True)
+            for future in tqdm(as_completed(futures), total=len(futures), desc=f'{hole_perc}% observability'):
+                plan_name, attacks, num_obs, error = future.result()
+                
+                if error is not None:
+                    error_count += 1
+                    print(f'\n✗ Error processing {plan_name}: {error}')
+                    continue
+                
+                total_observations += num_obs
+                for attack_perc, num_attacks in attacks.items():
+                    total_attacks[attack_perc] += num_attacks
+                    # Aggiorna l'istogramma degli attacchi
+                    histograms[attack_perc][num_attacks] += 1
             
-            output_file = f'{output_dir}/{attack_perc}_mask.json'
-            with open(output_file, 'w') as f:
-                json.dump(solutions_dict, f, indent=4)
-            print(f'Saved results to {output_file}')
+            # Salva i risultati di ogni percentuale di attacco
+            for attack_perc in attack_percentages:
+                print(f'\nApplied {attack_perc}% attack rate')
+                
+                output_file = f'{output_dir}/{attack_perc}_mask.json'
+                success_count = merge_shards(shard_dirs[attack_perc], output_file)
+                print(f'Saved results to {output_file}')
+                
+                attack_histogram[hole_perc][attack_perc] = dict(histograms[attack_perc])
+                
+                # Calcola la percentuale effettiva di attacchi
+                if total_observations > 0:
+                    actual_attack_perc = (total_attacks[attack_perc] / total_observations) * 100
+                    attack_histogram[hole_perc][attack_perc]["actual_atk_perc"] = actual_attack_perc
+                    print(f'Actual attack percentage: {actual_attack_perc:.2f}%')
+                
+                # Report errori
+                if error_count > 0:
+                    print(f'⚠ {error_count} problems failed (see {error_dir} for details)')
+                    attack_histogram[hole_perc][attack_perc]["errors"] = error_count
+                
+                # Salva anche un summary degli errori se ci sono stati
+                if error_count > 0:
+                    error_summary_file = f'{error_dir}/error_summary_{attack_perc}pct.txt'
+                    with open(error_summary_file, 'w') as f:
+                        f.write(f"Error Summary for {domain} - {hole_perc}% observability - {attack_perc}% attack\n")
+                        f.write(f"{'='*60}\n")
+                        f.write(f"Total problems: {len(plan_files)}\n")
+                        f.write(f"Successful: {success_count}\n")
+                        f.write(f"Failed: {error_count}\n")
+                        f.write(f"\nError details saved in subdirectories of: {error_dir}\n")
             
-            # Salva anche un summary degli errori se ci sono stati
-            if error_count > 0:
-                error_summary_file = f'{error_dir}/error_summary_{attack_perc}pct.txt'
-                with open(error_summary_file, 'w') as f:
-                    f.write(f"Error Summary for {domain} - {hole_perc}% observability - {attack_perc}% attack\n")
-                    f.write(f"{'='*60}\n")
-                    f.write(f"Total problems: {len(plan_files)}\n")
-                    f.write(f"Successful: {len(solutions_dict)}\n")
-                    f.write(f"Failed: {error_count}\n")
-                    f.write(f"\nError details saved in subdirectories of: {error_dir}\n")
-        
-        # Salva l'analisi degli attacchi per questa percentuale di hole
-        analysis_file = f'{output_dir}/atk_analysis.json'
-        with open(analysis_file, 'w') as f:
-            json.dump(attack_histogram[hole_perc], f, indent=4)
-        print(f'\nSaved attack analysis to {analysis_file}')
+            # Salva l'analisi degli attacchi per questa percentuale di hole
+            analysis_file = f'{output_dir}/atk_analysis.json'
+            with open(analysis_file, 'wb') as f:
+                f.write(orjson.dumps(attack_histogram[hole_perc], option=JSON_OPTIONS))
+            print(f'\nSaved attack analysis to {analysis_file}')
 
 
 def main():
@@ -482,17 +837,19 @@ def main():
     print(f'Hole percentages: {HOLE_PERCENTAGES}')
     print(f'Attack percentages: {ATTACK_PERCENTAGES}')
     
-    # Processa ogni dominio
-    for domain in DOMAINS:
-        try:
-            process_domain(
-                domain,
-                HOLE_PERCENTAGES,
-                ATTACK_PERCENTAGES
-            )
-        except Exception as e:
-            print(f'\nFATAL ERROR processing domain {domain}: {repr(e)}')
-            continue
+    # Processa ogni dominio, riutilizzando lo stesso pool di worker
+    with create_executor() as executor:
+        for domain in DOMAINS:
+            try:
+                process_domain(
+                    domain,
+                    HOLE_PERCENTAGES,
+                    ATTACK_PERCENTAGES,
+                    executor
+                )
+            except Exception as e:
+                print(f'\nFATAL ERROR processing domain {domain}: {repr(e)}')
+                continue
     
     print('\n' + '='*60)
     print('Processing completed successfully!')
@@ -5,10 +5,10 @@ This imports the existing `process_domain` from `main.py` and runs it for the co
 and hole percentages. Useful to parallelize mask creation by domain.
 
 Usage:
-  python run_masks_worker.py --domains blocksworld --attacks 10 20 30 [--tmp-dir ./tmp1]
+  python run_masks_worker.py --domains blocksworld --attacks 10 20 30 --workers 4
 
 The script respects the same directory structure as `main.py` (DATA_DIR etc.).
-Each worker should use a unique temp directory to avoid conflicts.
+Problem archives are read in memory, so workers do not need a temp directory.
 """
 import argparse
 import sys
@@ -23,50 +23,42 @@ if REPO_ROOT not in sys.path:
 from adversarial_gen.code import main as ag_main
 
 
-def run_worker(attack_percentages: List[int], tmp_dir: str = None, domains: List[str] = None, hole_percentages: List[int] = None):
+def run_worker(attack_percentages: List[int], domains: List[str] = None, hole_percentages: List[int] = None,
+               num_workers: int = None):
     # Use defaults from the original main if not provided
     if domains is None:
         domains = ag_main.DOMAINS
     if hole_percentages is None:
         hole_percentages = ag_main.HOLE_PERCENTAGES
     
-    # Set unique temp directory for this worker
-    if tmp_dir:
-        original_tmp = ag_main.TMP_DIR
-        ag_main.TMP_DIR = tmp_dir
-        os.makedirs(tmp_dir, exist_ok=True)
-        print(f"Worker temp directory: {tmp_dir}")
-    
     print(f"Worker started: attacks={attack_percentages} | domains={domains} | holes={hole_percentages}")
 
-    for domain in domains:
-        try:
-            print(f"\n{'='*60}")
-            print(f"Processing domain {domain.upper()}")
-            print(f"Attack percentages: {attack_percentages}")
-            print(f"{'='*60}")
-            ag_main.process_domain(domain, hole_percentages, attack_percentages)
-            print(f"\n✓ Completed domain {domain}\n")
-        except Exception as e:
-            print(f"\n✗ Error processing domain {domain}: {e}")
-            import traceback
-            traceback.print_exc()
-    
-    # Restore original TMP_DIR if changed
-    if tmp_dir:
-        ag_main.TMP_DIR = original_tmp
+    # One process pool (and one grounder per worker) shared by all domains
+    with ag_main.create_executor(num_workers) as executor:
+        for domain in domains:
+            try:
+                print(f"\n{'='*60}")
+                print(f"Processing domain {domain.upper()}")
+                print(f"Attack percentages: {attack_percentages}")
+                print(f"{'='*60}")
+                ag_main.process_domain(domain, hole_percentages, attack_percentages, executor)
+                print(f"\n✓ Completed domain {domain}\n")
+            except Exception as e:
+                print(f"\n✗ Error processing domain {domain}: {e}")
+                import traceback
+                traceback.print_exc()
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Run mask generation for specified domain(s) and attack percentage(s)')
     parser.add_argument('--attacks', '-a', type=int, nargs='+', required=True, 
                         help='Attack percentages to apply (e.g. 10 20 30)')
-    parser.add_argument('--tmp-dir', '-t', type=str, default=None,
-                        help='Unique temp directory for this worker (e.g. ./tmp1, ./tmp2)')
     parser.add_argument('--domains', '-d', type=str, nargs='*', default=None,
                         help='Optional list of domains to process (default: all in main.py)')
     parser.add_argument('--holes', '-H', type=int, nargs='*', default=None,
                         help='Optional list of hole percentages to process (default: all in main.py)')
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                        help='Number of worker processes (default: MASK_WORKERS or the physical cores)')
     args = parser.parse_args()
 
-    run_worker(args.attacks, tmp_dir=args.tmp_dir, domains=args.domains, hole_percentages=args.holes)
+    run_worker(args.attacks, domains=args.domains, hole_percentages=args.holes, num_workers=args.workers)
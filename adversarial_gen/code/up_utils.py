@@ -13,6 +13,10 @@ Questo modulo fornisce funzioni per:
 
 import random
 import json
+import functools
+import hashlib
+import re
+import sys
 from unified_planning.shortcuts import *
 from unified_planning.engines import PlanGenerationResultStatus, ValidationResultStatus, CompilationKind
 from unified_planning.io import PDDLReader
@@ -28,6 +32,21 @@ import numpy as np
 random.seed(42)  # Imposta seed per riproducibilità
 up.shortcuts.get_environment().credits_stream = None  # Disabilita output dei credits
 
+# Azioni composte i cui nomi contengono "_" (es. "take image" -> "take_image"),
+# necessario per alcuni domini come satellite
+_COMPOSITE_ACTIONS_RE = re.compile(r'take image|turn to|switch on|switch off')
+
+
+def _join_composite_action(match):
+    """Callback di _COMPOSITE_ACTIONS_RE.sub: "take image" -> "take_image"."""
+    return match.group(0).replace(' ', '_')
+
+# Tabelle per str.translate: rimuovono parentesi (e tab) in un solo passaggio
+_PARENS_TABLE = str.maketrans('', '', '()')
+_PARENS_TABS_TABLE = str.maketrans('', '', '()\t')
+# Fluenti UP "on(a, b)" -> "on a  b": '(' diventa spazio, ')' e ',' vengono rimossi
+_FLUENT_TABLE = str.maketrans({'(': ' ', ')': None, ',': None})
+
 
 # ============================================================================
 # GESTIONE FILE COMPRESSI
@@ -60,10 +79,68 @@ def open_compressed_file(file, output_dir):
         print('Unsupported file type')
 
 
+def extract_to_memory(file):
+    """
+    Legge in memoria il contenuto di un file compresso (ZIP o TAR.BZ2).
+    
+    Args:
+        file: Percorso del file compresso da leggere
+    
+    Returns:
+        Dizionario {nome_file: contenuto_in_byte} con i file dell'archivio
+    
+    Raises:
+        ValueError: Se il formato dell'archivio non è supportato
+    
+    Note:
+        Evita l'estrazione su disco: i file vengono poi passati alle varianti
+        *_from_bytes delle funzioni di lettura
+    """
+    files = {}
+    if file.endswith('.zip'):
+        with zipfile.ZipFile(file, 'r') as z:
+            for info in z.infolist():
+                if not info.is_dir():
+                    files[os.path.basename(info.filename)] = z.read(info)
+    elif file.endswith('.tar.bz2'):
+        with tarfile.open(file, 'r:bz2') as t:
+            for member in t.getmembers():
+                if member.isfile():
+                    files[os.path.basename(member.name)] = t.extractfile(member).read()
+    else:
+        raise ValueError(f'Unsupported file type: {file}')
+    return files
+
+
 # ============================================================================
 # LETTURA DATI DA FILE
 # ============================================================================
+
+def _read_text(path):
+    """
+    Legge un file di testo.
+    
+    Non c'è cache per percorso: gli archivi vengono estratti più volte nelle
+    stesse directory e tarfile/zipfile ripristinano mtime al secondo, quindi
+    file diversi con stessa dimensione risulterebbero uguali. Le cache a
+    valle (parsing del problema, sezioni del template) sono indicizzate sul
+    contenuto letto.
+    
+    Args:
+        path: Percorso del file da leggere
+    
+    Returns:
+        Contenuto del file
+    """
+    with open(path, 'r') as f:
+        return f.read()
+
     
+def _parse_observations(content):
+    """Rimuove parentesi e whitespace da ogni riga del contenuto di obs.dat."""
+    return [line.strip().translate(_PARENS_TABLE) for line in content.splitlines()]
+
+
 def get_observations(problem_dir, pereira=False):
     """
     Legge le osservazioni (azioni osservate) dal file obs.dat.
@@ -79,32 +156,31 @@ def get_observations(problem_dir, pereira=False):
         >>> get_observations('/path/to/problem')
         ['unstack b a', 'putdown b', 'pickup a']
     """
-    observations = []
-    with open(problem_dir + '/obs.dat', 'r') as f:
-        for line in f:
-            # Rimuove parentesi e whitespace da ogni osservazione
-            observations.append(line.strip().replace('(', '').replace(')', ''))
-    return observations
+    return _parse_observations(_read_text(problem_dir + '/obs.dat'))
 
-def get_goals(problem_dir: str, pereira: bool):
+
+def get_observations_from_bytes(files, pereira=False):
     """
-    Legge le ipotesi di goal dal file hyps.dat.
+    Come get_observations(), ma legge obs.dat dai file estratti in memoria.
     
     Args:
-        problem_dir: Directory contenente il file hyps.dat
-        pereira: Se True, usa formato Pereira (uppercase con virgole)
-                 Se False, usa formato standard (con virgole e spazi)
+        files: Dizionario {nome_file: byte} restituito da extract_to_memory()
+        pereira: Flag per dataset Pereira (attualmente non utilizzato)
     
     Returns:
-        Lista di liste, dove ogni lista interna rappresenta un goal ipotizzato
+        Lista di stringhe contenenti le osservazioni ripulite da parentesi
+    """
+    return _parse_observations(files['obs.dat'].decode())
+
+
+def _parse_goals(content, pereira):
+    """
+    Converte il contenuto di hyps.dat nella lista dei goal ipotizzati.
     
-    Example:
-        >>> get_goals('/path/to/problem', pereira=False)
-        [['on a b', 'on b c'], ['ontable a', 'ontable b']]
+    I predicati vengono internati (sys.intern): le ipotesi condividono gran
+    parte dei predicati, che così occupano un solo oggetto stringa ciascuno.
     """
     goals = []
-    with open(problem_dir + '/hyps.dat', 'r') as f:
-        content = f.read()
     
     # Join lines that start with comma (continuation lines in zenotravel)
     lines = content.split('\n')
@@ -132,37 +208,54 @@ def get_goals(problem_dir: str, pereira: bool):
             continue
             
         # Rimuove parentesi e whitespace
-        cleaned_line = line.replace('(', '').replace(')', '').strip()
+        cleaned_line = line.translate(_PARENS_TABLE).strip()
         
         if pereira:
             # Formato Pereira: converte in uppercase e split per virgola
-            goals.append([g.strip() for g in cleaned_line.upper().split(',') if g.strip()])
+            goals.append([sys.intern(p) for g in cleaned_line.upper().split(',') if (p := g.strip())])
         else:
             # Formato standard: split per virgola e spazio
-            goals.append([g.strip() for g in cleaned_line.split(',') if g.strip()])
+            goals.append([sys.intern(p) for g in cleaned_line.split(',') if (p := g.strip())])
     
     return goals
 
 
-def get_real_goal(problem_dir: str, pereira: bool):
+def get_goals(problem_dir: str, pereira: bool):
     """
-    Legge il goal reale dal file real_hyp.dat.
+    Legge le ipotesi di goal dal file hyps.dat.
     
     Args:
-        problem_dir: Directory contenente il file real_hyp.dat
+        problem_dir: Directory contenente il file hyps.dat
         pereira: Se True, usa formato Pereira (uppercase con virgole)
-                 Se False, usa formato standard
+                 Se False, usa formato standard (con virgole e spazi)
     
     Returns:
-        Lista di predicati che compongono il goal reale
+        Lista di liste, dove ogni lista interna rappresenta un goal ipotizzato
     
     Example:
-        >>> get_real_goal('/path/to/problem', pereira=False)
-        ['on a b', 'on b c', 'ontable c']
+        >>> get_goals('/path/to/problem', pereira=False)
+        [['on a b', 'on b c'], ['ontable a', 'ontable b']]
     """
-    with open(problem_dir + '/real_hyp.dat', 'r') as f:
-        # Read all content to handle multi-line goals (like zenotravel)
-        content = f.read().strip()
+    return _parse_goals(_read_text(problem_dir + '/hyps.dat'), pereira)
+
+
+def get_goals_from_bytes(files, pereira: bool):
+    """
+    Come get_goals(), ma legge hyps.dat dai file estratti in memoria.
+    
+    Args:
+        files: Dizionario {nome_file: byte} restituito da extract_to_memory()
+        pereira: Se True, usa formato Pereira (uppercase con virgole)
+    
+    Returns:
+        Lista di liste, dove ogni lista interna rappresenta un goal ipotizzato
+    """
+    return _parse_goals(files['hyps.dat'].decode(), pereira)
+
+
+def _parse_real_goal(content, pereira):
+    """Converte il contenuto di real_hyp.dat nella lista dei predicati del goal."""
+    content = content.strip()
     
     # Join lines that start with comma (continuation lines)
     lines = content.split('\n')
@@ -175,14 +268,72 @@ def get_real_goal(problem_dir: str, pereira: bool):
             line += ' ' + stripped
     
     # Clean up the line
-    line = line.strip().replace('(', '').replace(')', '')
+    line = line.strip().translate(_PARENS_TABLE)
     
     if pereira:
-        return [g.strip() for g in line.upper().split(',') if g.strip()]
+        return [sys.intern(p) for g in line.upper().split(',') if (p := g.strip())]
     else:
-        return [g.strip() for g in line.split(',') if g.strip()]
+        return [sys.intern(p) for g in line.split(',') if (p := g.strip())]
+
+
+def get_real_goal(problem_dir: str, pereira: bool):
+    """
+    Legge il goal reale dal file real_hyp.dat.
+    
+    Args:
+        problem_dir: Directory contenente il file real_hyp.dat
+        pereira: Se True, usa formato Pereira (uppercase con virgole)
+                 Se False, usa formato standard
+    
+    Returns:
+        Lista di predicati che compongono il goal reale
+    
+    Example:
+        >>> get_real_goal('/path/to/problem', pereira=False)
+        ['on a b', 'on b c', 'ontable c']
+    """
+    # Read all content to handle multi-line goals (like zenotravel)
+    return _parse_real_goal(_read_text(problem_dir + '/real_hyp.dat'), pereira)
+
+
+def get_real_goal_from_bytes(files, pereira: bool):
+    """
+    Come get_real_goal(), ma legge real_hyp.dat dai file estratti in memoria.
+    
+    Args:
+        files: Dizionario {nome_file: byte} restituito da extract_to_memory()
+        pereira: Se True, usa formato Pereira (uppercase con virgole)
+    
+    Returns:
+        Lista di predicati che compongono il goal reale
+    """
+    return _parse_real_goal(files['real_hyp.dat'].decode(), pereira)
         
 
+@functools.lru_cache(maxsize=256)
+def _template_sections_cached(content):
+    """Divide il template nelle sezioni :objects e :init, cercando solo la prima occorrenza."""
+    objects_section = content.split('(:objects', 1)[1].split(')', 1)[0].strip()
+    init_section = content.split('(:init', 1)[1].split('(:goal', 1)[0]
+    return objects_section, init_section
+
+
+def _template_sections(problem_dir):
+    """
+    Restituisce le sezioni (:objects e (:init di template.pddl.
+    
+    Il template viene letto e diviso una sola volta per problema, anche se
+    più funzioni ne estraggono parti diverse.
+    
+    Args:
+        problem_dir: Directory contenente template.pddl
+    
+    Returns:
+        Tuple (sezione_objects, sezione_init)
+    """
+    return _template_sections_cached(_read_text(problem_dir + '/template.pddl'))
+
+
 def get_template(problem_dir: str):
     """
     Legge il file template PDDL che contiene la struttura del problema.
@@ -193,8 +344,7 @@ def get_template(problem_dir: str):
     Returns:
         Stringa contenente l'intero contenuto del template
     """
-    with open(problem_dir + '/template.pddl', 'r') as f:
-        return f.read()
+    return _read_text(problem_dir + '/template.pddl')
     
 
 def get_objects(problem_dir: str):
@@ -211,11 +361,9 @@ def get_objects(problem_dir: str):
         Questa funzione assume una dichiarazione semplice degli oggetti.
         Per oggetti con tipi, usa get_objects_with_types()
     """
-    with open(problem_dir + '/template.pddl', 'r') as f:
-        # Estrae la sezione (:objects ...) e split per spazi
-        content = f.read()
-        objects_section = content.split('(:objects')[1].split(')')[0].strip()
-        return objects_section.split(' ')
+    # Estrae la sezione (:objects ...) e split per spazi
+    objects_section, _ = _template_sections(problem_dir)
+    return objects_section.split(' ')
 
 
 def get_objects_with_types(problem_dir: str):
@@ -235,11 +383,9 @@ def get_objects_with_types(problem_dir: str):
     Note:
         Se un oggetto non ha tipo specificato, usa 'object' come default
     """
-    with open(problem_dir + '/template.pddl', 'r') as f:
-        # Estrae la sezione objects e separa per linee
-        content = f.read()
-        objects_section = content.split('(:objects')[1].split(')')[0].strip()
-        objects_whole = objects_section.split('\n')
+    # Estrae la sezione objects e separa per linee
+    objects_section, _ = _template_sections(problem_dir)
+    objects_whole = objects_section.split('\n')
     
     objects = []
     for object_line in objects_whole:
@@ -276,14 +422,12 @@ def get_init_state(problem_dir: str):
     Note:
         I predicati vengono convertiti in uppercase e puliti da parentesi
     """
-    with open(problem_dir + '/template.pddl', 'r') as f:
-        content = f.read()
-        # Estrae la sezione tra (:init e (:goal
-        init_section = content.split('(:init')[1].split('(:goal')[0]
-        
-        # Pulisce da tab, parentesi e converte in uppercase
-        cleaned = init_section.replace("\t", "").replace("(", "").replace(")", "")
-        init_state = cleaned.strip().upper().split('\n')
+    # Estrae la sezione tra (:init e (:goal
+    _, init_section = _template_sections(problem_dir)
+    
+    # Pulisce da tab, parentesi e converte in uppercase
+    cleaned = init_section.translate(_PARENS_TABS_TABLE)
+    init_state = cleaned.strip().upper().split('\n')
     
     return init_state
 
@@ -311,11 +455,18 @@ def encode_obs(observations: list, dizionario: dict):
         >>> encode_obs(['pickup a', 'putdown a'], dizionario)
         [0, 1]
     """
-    encoded_obs = []
-    for obs in observations:
-        # Converte in uppercase e cerca nel dizionario
-        encoded_obs.append(dizionario[obs.upper()])
-    return encoded_obs
+    # Converte in uppercase e cerca nel dizionario, senza append per elemento
+    return list(map(dizionario.__getitem__, map(str.upper, observations)))
+
+
+def _invert_dictionary(dizionario: dict):
+    """
+    Costruisce il dizionario inverso {id_numerico: stringa}.
+    
+    Se più chiavi hanno lo stesso ID vince la prima, come nella ricerca
+    lineare sulle chiavi.
+    """
+    return {value: key for key, value in reversed(dizionario.items())}
 
 
 def decode_obs(encoded_obs: list, dizionario: dict):
@@ -332,14 +483,8 @@ def decode_obs(encoded_obs: list, dizionario: dict):
     Note:
         Operazione inversa di encode_obs()
     """
-    decoded_obs = []
-    for obs in encoded_obs:
-        # Cerca la chiave corrispondente al valore
-        for key, value in dizionario.items():
-            if value == obs:
-                decoded_obs.append(key)
-                break
-    return decoded_obs
+    inverso = _invert_dictionary(dizionario)
+    return [inverso[obs] for obs in encoded_obs if obs in inverso]
 
 
 def encode_goal(goal: list, dizionario: dict):
@@ -356,14 +501,30 @@ def encode_goal(goal: list, dizionario: dict):
     Note:
         I predicati non presenti nel dizionario vengono ignorati
     """
-    encoded_goal = []
-    for g in goal:
-        # Salta predicati non presenti nel dizionario
-        if g not in dizionario:
-            continue
-        # Converte in intero per garantire tipo corretto
-        encoded_goal.append(int(dizionario[g.strip()]))
-    return encoded_goal
+    # Una sola ricerca per predicato; i predicati non presenti nel dizionario
+    # (None) vengono saltati, gli ID convertiti in intero per garantire il tipo
+    return [int(v) for v in map(dizionario.get, goal) if v is not None]
+
+
+def encode_goals(goals: list, dizionario: dict):
+    """
+    Converte una lista di goal testuali in rappresentazione numerica.
+    
+    Equivalente a [encode_goal(goal, dizionario) for goal in goals], ma in
+    un'unica passata.
+    
+    Args:
+        goals: Lista di goal, ognuno lista di predicati
+        dizionario: Dizionario di mappatura {predicato: id_numerico}
+    
+    Returns:
+        Lista di liste di ID numerici, una per goal
+    
+    Note:
+        I predicati non presenti nel dizionario vengono ignorati
+    """
+    get = dizionario.get
+    return [[int(v) for v in map(get, goal) if v is not None] for goal in goals]
 
 
 def decode_goal(encoded_goal: list, dizionario: dict):
@@ -380,26 +541,24 @@ def decode_goal(encoded_goal: list, dizionario: dict):
     Note:
         Operazione inversa di encode_goal()
     """
-    decoded_goal = []
-    for g in encoded_goal:
-        # Cerca la chiave corrispondente al valore
-        for key, value in dizionario.items():
-            if value == g:
-                decoded_goal.append(key)
-                break
-    return decoded_goal
+    inverso = _invert_dictionary(dizionario)
+    return [inverso[g] for g in encoded_goal if g in inverso]
 
 
-def get_extended_goal(goal: list, dizionario: dict):
+def get_extended_goal(goal: list, dizionario: dict, as_array: bool = False):
     """
     Crea una rappresentazione one-hot encoding del goal.
     
     Args:
         goal: Lista di ID numerici dei predicati del goal
         dizionario: Dizionario completo dei predicati
+        as_array: Se True restituisce direttamente l'array NumPy (uint8),
+                  senza convertirlo in lista; utile se il vettore viene
+                  passato a un modello
     
     Returns:
-        Lista binaria dove 1 indica presenza del predicato nel goal
+        Lista binaria (o array se as_array=True) dove 1 indica presenza del
+        predicato nel goal
     
     Example:
         >>> dizionario = {'ON A B': 0, 'ON B C': 1, 'CLEAR A': 2}
@@ -407,12 +566,14 @@ def get_extended_goal(goal: list, dizionario: dict):
         [1, 0, 1]  # ON A B e CLEAR A sono presenti
     """
     # Crea vettore di zeri con lunghezza pari al dizionario
-    extended_goal = np.zeros(len(dizionario))
+    extended_goal = np.zeros(len(dizionario), dtype=np.uint8)
     
-    # Imposta a 1 le posizioni corrispondenti ai predicati del goal
-    for g in goal:
-        extended_goal[g] = 1
+    # Imposta a 1 le posizioni corrispondenti ai predicati del goal con
+    # un'unica assegnazione vettorizzata
+    extended_goal[np.asarray(goal, dtype=np.intp)] = 1
     
+    if as_array:
+        return extended_goal
     return extended_goal.tolist()
 
 
@@ -420,6 +581,13 @@ def get_extended_goal(goal: list, dizionario: dict):
 # CREAZIONE PROBLEMI PDDL
 # ============================================================================
 
+def _compose_real_problem(template: str, real_hyp: str) -> str:
+    """Sostituisce <HYPOTHESIS> nel template con la prima riga di real_hyp.dat."""
+    # Converte virgole in newline per formato PDDL
+    goal = real_hyp.split('\n', 1)[0].strip().replace(',', '\n')
+    return template.replace('<HYPOTHESIS>', f'{goal}')
+
+
 def create_real_problem(problem_dir: str, problem_name: str, pereira=False):
     """
     Crea un file problema PDDL usando il goal reale dal file real_hyp.dat.
@@ -432,16 +600,11 @@ def create_real_problem(problem_dir: str, problem_name: str, pereira=False):
     Note:
         Sostituisce il placeholder <HYPOTHESIS> nel template con il goal reale
     """
-    # Legge il template
-    with open(problem_dir + '/template.pddl', 'r') as f:
-        template = f.read()
+    # Legge template e goal reale e sostituisce il placeholder
+    template = _compose_real_problem(_read_text(problem_dir + '/template.pddl'),
+                                     _read_text(problem_dir + '/real_hyp.dat'))
     
-    # Legge il goal reale e converte virgole in newline per formato PDDL
-    with open(problem_dir + '/real_hyp.dat', 'r') as f:
-        goal = f.readline().strip().replace(',', '\n')
-    
-    # Sostituisce il placeholder e salva
-    template = template.replace('<HYPOTHESIS>', f'{goal}')
+    # Salva
     with open(problem_dir + f'/{problem_name}', 'w') as f:
         f.write(template)
 
@@ -457,11 +620,8 @@ def create_problem(problem_dir, pereira=False):
     Note:
         Versione semplificata di create_real_problem() con nome fisso 'problem.pddl'
     """
-    with open(problem_dir + '/template.pddl', 'r') as f:
-        template = f.read()
-    with open(problem_dir + '/real_hyp.dat', 'r') as f:
-        goal = f.readline().strip().replace(',', '\n')
-    template = template.replace('<HYPOTHESIS>', f'{goal}')
+    template = _compose_real_problem(_read_text(problem_dir + '/template.pddl'),
+                                     _read_text(problem_dir + '/real_hyp.dat'))
     with open(problem_dir + '/problem.pddl', 'w') as f:
         f.write(template)
 
@@ -478,8 +638,7 @@ def create_problem_with_goal(problem_dir, goal, pereira=False):
     Note:
         Utile per testare goal alternativi senza modificare real_hyp.dat
     """
-    with open(problem_dir + '/template.pddl', 'r') as f:
-        template = f.read()
+    template = _read_text(problem_dir + '/template.pddl')
     template = template.replace('<HYPOTHESIS>', f'{goal}')
     with open(problem_dir + '/problem.pddl', 'w') as f:
         f.write(template)
@@ -498,8 +657,7 @@ def create_problem_with_goal_and_name(problem_dir, goal, problem_name, pereira=F
     Note:
         Versione più flessibile che permette di specificare sia goal che nome
     """
-    with open(problem_dir + '/template.pddl', 'r') as f:
-        template = f.read()
+    template = _read_text(problem_dir + '/template.pddl')
     template = template.replace('<HYPOTHESIS>', f'{goal}')
     with open(problem_dir + f'/{problem_name}.pddl', 'w') as f:
         f.write(template)
@@ -519,8 +677,7 @@ def compose_new_problem(problem_dir, new_init, new_goal, pereira=False):
         Sostituisce completamente la sezione (:init e (:goal del template
         Utile per creare sotto-problemi o problemi modificati
     """
-    with open(problem_dir + '/template.pddl', 'r') as f:
-        template = f.read()
+    template = _read_text(problem_dir + '/template.pddl')
     
     if pereira:
         template = template.lower().split('(:init')[0] + f'(:init\n{new_init})\n' + "(:goal\n(and\n" + f'{new_goal}\n)\n)\n)'
@@ -551,16 +708,15 @@ def new_observation(problem_dir: str, filename: str, new_obs: str):
 # GROUNDING E AZIONI
 # ============================================================================
 
-def fix_domain_file(domain_path: str) -> str:
+def fix_domain_content(content: str) -> str:
     """
     Fix common PDDL syntax issues that unified_planning parser doesn't support.
-    Creates a fixed version of the domain file.
     
     Args:
-        domain_path: Path to the original domain.pddl file
+        content: Text of the original domain.pddl file
     
     Returns:
-        Path to the fixed domain file
+        Fixed domain text (the input itself if no fix is needed)
     
     Note:
         Fixes the '(either type1 type2)' syntax which is not supported by
@@ -568,12 +724,9 @@ def fix_domain_file(domain_path: str) -> str:
         - Creates a parent type 'locable' that both 'person' and 'aircraft' inherit from
         - Replaces (either person aircraft) with the parent type 'locable'
     """
-    with open(domain_path, 'r') as f:
-        content = f.read()
-    
     # Check if file needs fixing (contains 'either' keyword)
     if 'either' not in content.lower():
-        return domain_path
+        return content
     
     import re
     
@@ -614,7 +767,29 @@ def fix_domain_file(domain_path: str) -> str:
         
         return f'?{var_name} - {parent_type}'
     
-    fixed_content = re.sub(either_pattern, replace_either, content)
+    return re.sub(either_pattern, replace_either, content)
+
+
+def fix_domain_file(domain_path: str) -> str:
+    """
+    Fix common PDDL syntax issues that unified_planning parser doesn't support.
+    Creates a fixed version of the domain file.
+    
+    Args:
+        domain_path: Path to the original domain.pddl file
+    
+    Returns:
+        Path to the fixed domain file
+    
+    Note:
+        See fix_domain_content() for the applied fixes
+    """
+    with open(domain_path, 'r') as f:
+        content = f.read()
+    
+    fixed_content = fix_domain_content(content)
+    if fixed_content == content:
+        return domain_path
     
     # Save fixed version
     fixed_path = domain_path.replace('.pddl', '_fixed.pddl')
@@ -624,6 +799,73 @@ def fix_domain_file(domain_path: str) -> str:
     return fixed_path
 
         
+@functools.lru_cache(maxsize=32)
+def _parse_problem_cached(domain_str, problem_str):
+    """Parsa dominio e problema da stringa; il risultato è in cache per contenuto."""
+    return PDDLReader().parse_problem_string(domain_str, problem_str)
+
+
+def load_problem(domain_path, problem_path):
+    """
+    Legge e parsa un problema PDDL, riutilizzando il parsing già eseguito
+    se dominio e problema non sono cambiati.
+    
+    Args:
+        domain_path: Percorso di domain.pddl
+        problem_path: Percorso del file problema
+    
+    Returns:
+        Problema Unified Planning (condiviso: usare clone() prima di
+        modificarlo, ad esempio per aggiungere metriche di qualità)
+    """
+    return _parse_problem_cached(_read_text(domain_path), _read_text(problem_path))
+
+
+# Azioni groundate già calcolate nel processo, indicizzate per firma
+_grounded_actions_cache = {}
+
+
+def grounding_signature(domain, template, pereira=False):
+    """
+    Calcola la firma (blake2b) di dominio, template e formato di un problema.
+    
+    Problemi con la stessa firma hanno le stesse azioni groundate,
+    indipendentemente dal goal.
+    
+    Args:
+        domain: Contenuto in byte di domain.pddl
+        template: Contenuto in byte di template.pddl
+        pereira: Flag per dataset Pereira
+    
+    Returns:
+        Digest esadecimale (16 byte)
+    """
+    digest = hashlib.blake2b(b'pereira' if pereira else b'', digest_size=16)
+    digest.update(domain)
+    digest.update(template)
+    return digest.hexdigest()
+
+
+def clear_grounded_actions_cache():
+    """Svuota la cache delle azioni groundate del processo corrente."""
+    _grounded_actions_cache.clear()
+
+
+@functools.lru_cache(maxsize=4)
+def get_grounder(name="fast-downward-reachability-grounder"):
+    """
+    Restituisce il grounder con il nome indicato, creandolo una sola volta
+    per processo.
+    
+    Args:
+        name: Nome del Compiler di Unified Planning
+    
+    Returns:
+        Compilatore per il grounding delle azioni (condiviso, non chiuderlo)
+    """
+    return Compiler(name=name)
+
+
 def get_grounded_actions(problem_dir, grounder, pereira=False):
     """
     Ottiene la lista di tutte le azioni groundate per un problema.
@@ -637,30 +879,73 @@ def get_grounded_actions(problem_dir, grounder, pereira=False):
         Lista di stringhe con i nomi delle azioni groundate filtrate
     
     Note:
-        - Crea automaticamente problem.pddl dal template
+        - Il problema viene composto dal template e dal goal reale in memoria,
+          senza scrivere problem.pddl su disco
         - Filtra azioni con parametri duplicati
         - Gestisce azioni composte (es. "take image" -> "take_image")
     
     Example:
-        >>> grounder = Compiler(name="fast-downward-reachability-grounder")
+        >>> grounder = get_grounder("fast-downward-reachability-grounder")
         >>> actions = get_grounded_actions('/path/to/problem', grounder)
         >>> print(actions)
         ['pickup a', 'pickup b', 'putdown a', ...]
     """
-    # Crea il file problem.pddl dal template
-    create_problem(problem_dir, pereira=pereira)
+    domain_str = _read_text(f'{problem_dir}/domain.pddl')
+    template = _read_text(f'{problem_dir}/template.pddl')
+    key = grounding_signature(domain_str.encode(), template.encode(), pereira)
+    if key not in _grounded_actions_cache:
+        # Compone il problema dal template, come create_problem()
+        problem_str = _compose_real_problem(template, _read_text(f'{problem_dir}/real_hyp.dat'))
+        
+        # Fix domain if needed (handles 'either' syntax issues)
+        problem = _parse_problem_cached(fix_domain_content(domain_str), problem_str)
+        _grounded_actions_cache[key] = _ground_action_names(problem, grounder)
+    
+    return list(_grounded_actions_cache[key])
+
+
+def get_grounded_actions_from_bytes(files, grounder, pereira=False):
+    """
+    Come get_grounded_actions(), ma lavora sui file estratti in memoria.
     
-    # Fix domain file if needed (handles 'either' syntax issues)
-    domain_path = f'{problem_dir}/domain.pddl'
-    fixed_domain_path = fix_domain_file(domain_path)
+    Args:
+        files: Dizionario {nome_file: byte} restituito da extract_to_memory()
+        grounder: Istanza del compilatore per il grounding
+        pereira: Flag per dataset Pereira
     
-    # Legge e parsa il problema PDDL
-    reader = PDDLReader()
-    problem = reader.parse_problem(
-        fixed_domain_path, 
-        f'{problem_dir}/problem.pddl'
-    )
+    Returns:
+        Lista di stringhe con i nomi delle azioni groundate filtrate
+    
+    Note:
+        Il problema viene composto dal template e dal goal reale e parsato
+        direttamente da stringa, senza scrivere problem.pddl su disco.
+        A differenza di get_grounded_actions() il risultato non viene messo
+        in cache: lo memorizza il chiamante (es. main.get_valid_actions),
+        così la stessa lista non è tenuta due volte nel processo
+    """
+    # Compone il problema dal template, come create_problem()
+    problem_str = _compose_real_problem(files['template.pddl'].decode(),
+                                        files['real_hyp.dat'].decode())
+    
+    # Fix domain if needed (handles 'either' syntax issues)
+    domain_str = fix_domain_content(files['domain.pddl'].decode())
+    
+    problem = _parse_problem_cached(domain_str, problem_str)
+    
+    return _ground_action_names(problem, grounder)
 
+
+def _ground_action_names(problem, grounder):
+    """
+    Esegue il grounding di un problema e ne restituisce i nomi delle azioni.
+    
+    Args:
+        problem: Problema Unified Planning da groundare
+        grounder: Istanza del compilatore per il grounding
+    
+    Returns:
+        Lista di stringhe con i nomi delle azioni groundate filtrate
+    """
     # Esegue il grounding del problema
     grounder_result = grounder.compile(problem, CompilationKind.GROUNDING)
     ground_problem = grounder_result.problem
@@ -677,18 +962,13 @@ def get_grounded_actions(problem_dir, grounder, pereira=False):
         
         # Gestisce azioni composte specifiche (es. "take image" -> "take_image")
         # Necessario per alcuni domini come satellite
-        if any(phrase in action_name for phrase in ["take image", "turn to", "switch on", "switch off"]):
-            action_name = (action_name
-                          .replace("take image", "take_image")
-                          .replace("turn to", "turn_to")
-                          .replace("switch on", "switch_on")
-                          .replace("switch off", "switch_off"))
+        action_name = _COMPOSITE_ACTIONS_RE.sub(_join_composite_action, action_name)
         
         # Divide l'azione in parti (nome + parametri)
         parts = action_name.split(" ")
         
         # Filtra azioni con parametri duplicati (es. "move a a" non è valido)
-        if all(parts.count(p.strip()) <= 1 for p in parts):
+        if len(set(parts)) == len(parts):
             filtered_actions.append(action_name)
     
     return filtered_actions
@@ -713,11 +993,7 @@ def compute_plan(problem_dir: str, problem_name: str):
         Usa un planner oneshot (risolve il problema una sola volta)
         Cerca una soluzione satisficing, non necessariamente ottimale
     """
-    reader = PDDLReader()
-    problem = reader.parse_problem(
-        f"{problem_dir}/domain.pddl", 
-        f"{problem_dir}/{problem_name}"
-    )
+    problem = load_problem(f"{problem_dir}/domain.pddl", f"{problem_dir}/{problem_name}")
     
     # Usa planner oneshot
     planner = OneshotPlanner()
@@ -745,30 +1021,30 @@ def compute_anytime_optimal_plan(problem_dir: str, problem_name: str):
         Cerca piani progressivamente migliori finché trova l'ottimo
         Se non trova l'ottimo, ritorna il piano più corto tra quelli trovati
     """
-    reader = PDDLReader()
-    problem = reader.parse_problem(
-        f"{problem_dir}/domain.pddl", 
-        f"{problem_dir}/{problem_name}"
-    )
+    # Copia del problema in cache, perché viene aggiunta una metrica
+    problem = load_problem(f"{problem_dir}/domain.pddl", f"{problem_dir}/{problem_name}").clone()
     
     # Aggiunge metrica di qualità: minimizza lunghezza piano
     problem.add_quality_metric(up.model.metrics.MinimizeSequentialPlanLength())
     
     # Usa planner anytime con garanzia di piani ottimali
     planner = AnytimePlanner(anytime_guarantee="OPTIMAL_PLANS")
-    solutions = []
+    best_plan = None
+    best_len = None
     
     for i, p in enumerate(planner.get_solutions(problem)):
         print(f'Solution {i+1} status: {p.status}')
         if p.status == PlanGenerationResultStatus.SOLVED_OPTIMALLY:
             # Trovato piano ottimale, ritorna immediatamente
             return p.plan
-        else:
-            # Accumula soluzioni subottimali
-            solutions.append(p.plan)
+        elif p.plan is not None:
+            # Tiene solo il piano subottimale più corto (il primo a parità)
+            plan_len = len(p.plan.actions)
+            if best_len is None or plan_len < best_len:
+                best_plan, best_len = p.plan, plan_len
     
     # Se non trovato ottimo, ritorna il piano più corto
-    return min(solutions, key=lambda x: len(x.actions)) if solutions else None
+    return best_plan
 
 
 def compute_anytime_suboptimal_plan(problem_dir: str, problem_name: str):
@@ -786,11 +1062,8 @@ def compute_anytime_suboptimal_plan(problem_dir: str, problem_name: str):
         Timeout di 30 secondi
         Ritorna il miglior piano trovato entro il tempo limite
     """
-    reader = PDDLReader()
-    problem = reader.parse_problem(
-        f"{problem_dir}/domain.pddl", 
-        f"{problem_dir}/{problem_name}"
-    )
+    # Copia del problema in cache, perché viene aggiunta una metrica
+    problem = load_problem(f"{problem_dir}/domain.pddl", f"{problem_dir}/{problem_name}").clone()
     
     # Aggiunge metrica di qualità
     problem.add_quality_metric(up.model.metrics.MinimizeSequentialPlanLength())
@@ -825,12 +1098,11 @@ def compute_optimum_or_anytime_plan(problem_dir: str, problem_name: str, primo_p
     Note:
         Timeout di 60 secondi per il planner anytime
         Se fallisce, usa il planner di backup (primo_planner)
+        Il backup parte solo dopo l'anytime: avviarlo in parallelo lascerebbe
+        un processo Fast Downward attivo ogni volta che l'anytime trova un piano
     """
-    reader = PDDLReader()
-    problem = reader.parse_problem(
-        f"{problem_dir}/domain.pddl", 
-        f"{problem_dir}/{problem_name}"
-    )
+    # Copia del problema in cache, perché viene aggiunta una metrica
+    problem = load_problem(f"{problem_dir}/domain.pddl", f"{problem_dir}/{problem_name}").clone()
     
     # Aggiunge metrica di qualità
     problem.add_quality_metric(up.model.metrics.MinimizeSequentialPlanLength())
@@ -847,6 +1119,21 @@ def compute_optimum_or_anytime_plan(problem_dir: str, problem_name: str, primo_p
     return solution
 
 
+@functools.lru_cache(maxsize=4)
+def get_validator(name="tamer"):
+    """
+    Restituisce il validatore con il nome indicato, creandolo una sola volta
+    per processo.
+    
+    Args:
+        name: Nome del PlanValidator di Unified Planning
+    
+    Returns:
+        Validatore di piani (condiviso, non chiuderlo)
+    """
+    return PlanValidator(name=name)
+
+
 def plan_validation(problem_dir: str, plan_name: str, problem_name: str):
     """
     Valida un piano rispetto a un problema PDDL.
@@ -860,19 +1147,15 @@ def plan_validation(problem_dir: str, plan_name: str, problem_name: str):
         True se il piano è valido, False altrimenti
     
     Note:
-        Usa il validatore "tamer" per verificare la validità del piano
+        Usa il validatore "tamer" (riutilizzato tramite get_validator) per verificare la validità del piano
         Stampa lo status della validazione
     """
+    problem = load_problem(f"{problem_dir}/domain.pddl", f"{problem_dir}/{problem_name}")
     reader = PDDLReader()
-    problem = reader.parse_problem(
-        f"{problem_dir}/domain.pddl", 
-        f"{problem_dir}/{problem_name}"
-    )
     plan = reader.parse_plan(problem, f"{problem_dir}/{plan_name}")
     
     # Valida il piano
-    with PlanValidator(name="tamer") as validator:
-        result = validator.validate(problem, plan)
+    result = get_validator().validate(problem, plan)
     
     print(result.status)
     if result.status == ValidationResultStatus.VALID:
@@ -887,33 +1170,31 @@ def plan_validation(problem_dir: str, plan_name: str, problem_name: str):
 # SIMULAZIONE STATI
 # ============================================================================
     
-def get_states(problem_dir: str, plan: SequentialPlan):
+def iter_states(problem_dir: str, plan: SequentialPlan, problem_name: str = "problem.pddl"):
     """
-    Simula l'esecuzione di un piano e ottiene tutti gli stati intermedi.
+    Simula l'esecuzione di un piano restituendo gli stati uno alla volta.
     
     Args:
-        problem_dir: Directory contenente domain.pddl e problem.pddl
+        problem_dir: Directory contenente domain.pddl e il problema
         plan: Piano sequenziale da simulare
+        problem_name: Nome del file problema (default: problem.pddl)
     
-    Returns:
-        Lista di stati, dal s iniziale a quello finale
+    Yields:
+        Gli stati, dal s iniziale a quello finale
     
     Note:
-        Ogni stato nella lista rappresenta la configurazione del mondo
-        dopo l'applicazione dell'azione corrispondente
+        Generatore: permette di consumare gli stati in modo lazy,
+        es. map(get_new_state, iter_states(...))
+        Si interrompe alla prima azione non applicabile
     """
-    reader = PDDLReader()
-    problem = reader.parse_problem(
-        f"{problem_dir}/domain.pddl", 
-        f"{problem_dir}/problem.pddl"
-    )
+    problem = load_problem(f"{problem_dir}/domain.pddl", f"{problem_dir}/{problem_name}")
     
     # Inizializza il simulatore e ottiene lo stato iniziale
     with SequentialSimulator(problem) as simulator:
         initial_state = simulator.get_initial_state()
     
     current_state = initial_state
-    states = [current_state]
+    yield current_state
     
     # Simula l'applicazione di ogni azione
     for action_instance in plan.actions:
@@ -921,9 +1202,25 @@ def get_states(problem_dir: str, plan: SequentialPlan):
         if current_state is None:
             print(f'Error in applying: {action_instance}')
             break
-        states.append(current_state)
+        yield current_state
+
+
+def get_states(problem_dir: str, plan: SequentialPlan):
+    """
+    Simula l'esecuzione di un piano e ottiene tutti gli stati intermedi.
+    
+    Args:
+        problem_dir: Directory contenente domain.pddl e problem.pddl
+        plan: Piano sequenziale da simulare
+    
+    Returns:
+        Lista di stati, dal s iniziale a quello finale
     
-    return states
+    Note:
+        Ogni stato nella lista rappresenta la configurazione del mondo
+        dopo l'applicazione dell'azione corrispondente
+    """
+    return list(iter_states(problem_dir, plan))
 
 
 def get_states_with_name(problem_dir: str, plan: SequentialPlan, problem_name: str):
@@ -938,26 +1235,7 @@ def get_states_with_name(problem_dir: str, plan: SequentialPlan, problem_name: s
     Returns:
         Lista di stati risultanti dalla simulazione del piano
     """
-    reader = PDDLReader()
-    problem = reader.parse_problem(
-        f"{problem_dir}/domain.pddl", 
-        f"{problem_dir}/{problem_name}"
-    )
-    
-    with SequentialSimulator(problem) as simulator:
-        initial_state = simulator.get_initial_state()
-    
-    current_state = initial_state
-    states = [current_state]
-    
-    for action_instance in plan.actions:
-        current_state = simulator.apply(current_state, action_instance)
-        if current_state is None:
-            print(f'Error in applying: {action_instance}')
-            break
-        states.append(current_state)
-    
-    return states
+    return list(iter_states(problem_dir, plan, problem_name))
 
 
 def extractValues(state):
@@ -971,18 +1249,20 @@ def extractValues(state):
         Dizionario con tutti i valori dello stato e dei suoi predecessori
     
     Note:
-        Funzione ricorsiva che risale la catena di stati padre
+        Risale iterativamente la catena di stati padre (nessun limite di ricorsione)
         I valori più recenti sovrascrivono quelli precedenti
     """
-    values = {}
-    
-    # Risale ricorsivamente agli stati padre
-    if state._father != None:
-        values = extractValues(state._father)
+    # Raccoglie la catena di stati, dal corrente alla radice
+    chain = []
+    while state is not None:
+        chain.append(state)
+        state = state._father
     
-    # Aggiorna/sovrascrive con i valori dello stato corrente
-    for i in state._values:
-        values[i] = state._values[i]
+    # Applica i valori dalla radice al corrente, così l'ordine delle chiavi
+    # resta quello di prima inserzione e i figli sovrascrivono i padri
+    values = {}
+    for s in reversed(chain):
+        values.update(s._values)
     
     return values
 
@@ -1001,24 +1281,22 @@ def get_new_state(state):
         Filtra solo i predicati veri (ignora quelli falsi)
         Converte i parametri in uppercase
     """
-    true_facts = ""
+    true_facts = []
     values = extractValues(state)
     
     for key, value in values.items():
         # Considera solo predicati veri
         if value.is_true():
             # Converte il predicato in formato leggibile
-            parts = str(key).replace('(', ' ').replace(')', '').replace(',', '').split()
+            parts = str(key).translate(_FLUENT_TABLE).split()
             
             # Converte parametri in uppercase (mantiene nome predicato lowercase)
-            for p in range(len(parts[1:])):
-                parts[p + 1] = parts[p + 1].upper()
+            parts[1:] = map(str.upper, parts[1:])
             
             # Ricostruisce in formato PDDL
-            formatted_key = "(" + " ".join(parts) + ")"
-            true_facts += formatted_key + "\n"
+            true_facts.append("(" + " ".join(parts) + ")\n")
     
-    return true_facts
+    return "".join(true_facts)
 
 
 # ============================================================================
@@ -1033,9 +1311,10 @@ def kill_fast_downward_processes():
         Utile per pulire processi rimasti appesi dopo timeout o errori
         Cerca processi con 'downward' nel nome del comando
     """
-    for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
+    # Legge solo la cmdline; None per processi di cui non è accessibile
+    for proc in psutil.process_iter(['cmdline']):
         try:
-            if 'downward' in ' '.join(proc.info['cmdline']).lower():
+            if any('downward' in arg.lower() for arg in proc.info['cmdline'] or ()):
                 print(f"Killing leftover Fast Downward process (PID {proc.pid})")
                 proc.kill()
         except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
@@ -1062,26 +1341,27 @@ def pddl_style_strings_to_plan(action_strings, problem):
     """
     plan_actions = []
     
+    # Indici per nome di azioni e oggetti, costruiti una sola volta
+    actions_by_name = {a.name: a for a in problem.actions}
+    objects_by_name = {o.name: o for o in problem.all_objects}
+    
     for line in action_strings:
-        # Rimuove parentesi esterne e whitespace
-        line = line.strip().strip('()')
-        if not line:
+        # Rimuove parentesi e separa nome azione da parametri
+        parts = line.translate(_PARENS_TABLE).split()
+        if not parts:
             continue
 
-        # Separa nome azione da parametri
-        parts = line.split()
         action_name = parts[0].lower()  # Nome azione in lowercase
-        args = [p.strip() for p in parts[1:]]
 
         # Recupera l'azione dal dominio
-        action = problem.action(action_name)
+        action = actions_by_name.get(action_name)
         if action is None:
             raise ValueError(f"Azione '{action_name}' non trovata nel dominio.")
 
         # Converte parametri in oggetti del problema
         obj_args = []
-        for arg in args:
-            obj = problem.object(arg)
+        for arg in parts[1:]:
+            obj = objects_by_name.get(arg)
             if obj is None:
                 raise ValueError(f"Oggetto '{arg}' non trovato nel problema.")
             obj_args.append(obj)
@@ -1091,4 +1371,4 @@ def pddl_style_strings_to_plan(action_strings, problem):
         plan_actions.append(act_instance)
 
     # Ritorna il piano sequenziale
-    return SequentialPlan(plan_actions)
\ No newline at end of file
+    return SequentialPlan(plan_actions)
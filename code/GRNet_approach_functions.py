@@ -12,8 +12,20 @@ from os.path import join
 import pickle
 import os
 import json
+import functools
+import io
+import itertools
+import shutil
+import tarfile
+import zipfile
 import tensorflow as tf
-from typing import Union
+from typing import Iterable, Union
+
+try:
+    # orjson parses the multi-MB mask files several times faster than json
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
 
 
 # ============================================================================
@@ -65,11 +77,9 @@ class AttentionWeights(Layer):
 
     def call(self, x, mask=None):
         import tensorflow.keras.backend as K
-        features_dim = self.features_dim
-        step_dim = self.step_dim
 
-        eij = K.reshape(K.dot(K.reshape(x, (-1, features_dim)),
-                        K.reshape(self.W, (features_dim, 1))), (-1, step_dim))
+        # (batch, steps, features) . (features,) -> (batch, steps) in one op
+        eij = tf.tensordot(x, self.W, axes=1)
 
         if self.bias:
             eij += self.b
@@ -78,10 +88,11 @@ class AttentionWeights(Layer):
 
         a = K.exp(eij)
 
+        # Cast to the dtype of a (float16 under a mixed precision policy)
         if mask is not None:
-            a *= K.cast(mask, K.floatx())
+            a *= K.cast(mask, a.dtype)
 
-        a /= K.cast(K.sum(a, axis=1, keepdims=True) + K.epsilon(), K.floatx())
+        a /= K.cast(K.sum(a, axis=1, keepdims=True) + K.epsilon(), a.dtype)
 
         return a
 
@@ -121,6 +132,82 @@ class ContextVector(Layer):
         return dict(list(base_config.items()))
 
 
+class AttentionPool(Layer):
+    """AttentionWeights followed by ContextVector, fused in a single layer.
+
+    Same weights (W, b) and output as the two-layer block, without exposing
+    the attention weights as a separate tensor between layers.
+    """
+    def __init__(self, step_dim,
+                 W_regularizer=None, b_regularizer=None,
+                 W_constraint=None, b_constraint=None,
+                 bias=True, **kwargs):
+        self.supports_masking = True
+        self.init = initializers.get('glorot_uniform')
+
+        self.W_regularizer = regularizers.get(W_regularizer)
+        self.b_regularizer = regularizers.get(b_regularizer)
+
+        self.W_constraint = constraints.get(W_constraint)
+        self.b_constraint = constraints.get(b_constraint)
+
+        self.bias = bias
+        self.step_dim = step_dim
+        self.features_dim = 0
+        super(AttentionPool, self).__init__(**kwargs)
+
+    def build(self, input_shape):
+        assert len(input_shape) == 3
+
+        self.W = self.add_weight(shape=(input_shape[-1],),
+                                 initializer=self.init,
+                                 name='{}_W'.format(self.name),
+                                 regularizer=self.W_regularizer,
+                                 constraint=self.W_constraint)
+        self.features_dim = input_shape[-1]
+
+        if self.bias:
+            self.b = self.add_weight(shape=(input_shape[1],),
+                                     initializer='zero',
+                                     name='{}_b'.format(self.name),
+                                     regularizer=self.b_regularizer,
+                                     constraint=self.b_constraint)
+        else:
+            self.b = None
+
+        self.built = True
+
+    def compute_mask(self, input, input_mask=None):
+        return None
+
+    def call(self, x, mask=None):
+        import tensorflow.keras.backend as K
+
+        eij = tf.tensordot(x, self.W, axes=1)
+
+        if self.bias:
+            eij += self.b
+
+        a = K.exp(K.tanh(eij))
+
+        # Cast to the dtype of a (float16 under a mixed precision policy)
+        if mask is not None:
+            a *= K.cast(mask, a.dtype)
+
+        a /= K.cast(K.sum(a, axis=1, keepdims=True) + K.epsilon(), a.dtype)
+
+        # Weighted sum over the steps: (batch, steps, features) x (batch, steps)
+        return tf.einsum('bsd,bs->bd', x, a)
+
+    def compute_output_shape(self, input_shape):
+        return input_shape[0], self.features_dim
+
+    def get_config(self):
+        config={'step_dim':self.step_dim}
+        base_config = super(AttentionPool, self).get_config()
+        return dict(list(base_config.items()) + list(config.items()))
+
+
 # ============================================================================
 # Constants Class
 # ============================================================================
@@ -162,6 +249,7 @@ class C:
     
     CUSTOM_OBJECTS = {'AttentionWeights': AttentionWeights,
                    'ContextVector' : ContextVector,
+                   'AttentionPool' : AttentionPool,
                    'custom_multilabel_loss_v3' : BinaryCrossentropy}
 
 
@@ -183,24 +271,41 @@ class UnknownIndexError(Exception):
 # Unpack Files Methods
 # ============================================================================
 
+def _reset_dir(target_dir: str) -> None:
+    """Remove target_dir if it exists and recreate it empty."""
+    shutil.rmtree(target_dir, ignore_errors=True)
+    os.makedirs(target_dir)
+
+
 def unzip_file(file_path: str, target_dir: str) -> None:
     """Unzip a file in an empty directory."""
-    if os.path.exists(target_dir):
-        for f in os.listdir(target_dir):
-            os.remove(join(target_dir, f))
-        os.rmdir(target_dir)
-    os.mkdir(target_dir)
-    os.system(f'unzip -qq {file_path} -d {target_dir}')
+    _reset_dir(target_dir)
+    with zipfile.ZipFile(file_path) as zf:
+        zf.extractall(target_dir)
     
 
 def unpack_bz2(file_path: str, target_dir: str) -> None:
     """Unpack a .bz2 file in an empty directory."""
-    if os.path.exists(target_dir):
-        for f in os.listdir(target_dir):
-            os.remove(join(target_dir, f))
-        os.rmdir(target_dir)
-    os.mkdir(target_dir)
-    os.system(f'tar -xf {file_path} -C {target_dir}')
+    _reset_dir(target_dir)
+    # 'r:*' detects the compression like `tar -xf` did
+    with tarfile.open(file_path, 'r:*') as tf_archive:
+        tf_archive.extractall(target_dir)
+
+
+def read_archive(file_path: str) -> dict:
+    """Read the files of a .zip or .bz2 archive in memory as {name: bytes}."""
+    files = {}
+    if file_path.endswith('.zip'):
+        with zipfile.ZipFile(file_path) as zf:
+            for info in zf.infolist():
+                if not info.is_dir():
+                    files[os.path.basename(info.filename)] = zf.read(info)
+    else:
+        with tarfile.open(file_path, 'r:*') as tf_archive:
+            for member in tf_archive.getmembers():
+                if member.isfile():
+                    files[os.path.basename(member.name)] = tf_archive.extractfile(member).read()
+    return files
 
 
 # ============================================================================
@@ -217,10 +322,19 @@ def load_file(file: str, binary: bool = False, use_pickle: bool = False):
             output = pickle.load(rf)
         else:
             output = rf.readlines()
-        rf.close()
     return output
 
 
+def iter_lines(file: str, data: bytes = None):
+    """Yield the lines of a text file (or of its content, if given) one at a time."""
+    if data is not None:
+        yield from io.StringIO(data.decode())
+        return
+    with open(file, 'r') as rf:
+        yield from rf
+
+
+@functools.lru_cache(maxsize=8192)
 def remove_parentheses(line: str) -> str:
     """Remove parentheses from a string."""
     msg = (f'Error while parsing a line. Expected "(custom '
@@ -240,16 +354,20 @@ def remove_parentheses(line: str) -> str:
         raise FileFormatError(msg)
 
 
+@functools.lru_cache(maxsize=None)
+def _fallback_index(dictionary_len: int) -> int:
+    """Index used for unknown keys, the same one np.random.seed(47) gave."""
+    return int(np.random.RandomState(47).randint(0, dictionary_len))
+
+
 def retrieve_from_dict(key: str, dictionary: dict):
     """Return the dictionary value given the key."""
-    msg_error = f'Key {key.upper()} is not in the dictionary'
-    
-    try:
-        return dictionary[key.upper()]
-    except KeyError:
-        print(msg_error)
-        np.random.seed(47)
-        return np.random.randint(0,len(dictionary))
+    key = key.upper()
+    value = dictionary.get(key)
+    if value is None:
+        print(f'Key {key} is not in the dictionary')
+        return _fallback_index(len(dictionary))
+    return value
 
 
 def parse_correct_goal(line: str, goals_dict: dict = None) -> list:
@@ -271,7 +389,7 @@ def parse_correct_goal(line: str, goals_dict: dict = None) -> list:
         raise FileFormatError(msg_empty)
 
 
-def parse_observations(lines: list, obs_dict: dict = None) -> list:
+def parse_observations(lines: Iterable[str], obs_dict: dict = None) -> list:
     """Removes parentheses and empty strings from the observations list."""
     msg_empty='Observations list is empty.'
     
@@ -289,7 +407,7 @@ def parse_observations(lines: list, obs_dict: dict = None) -> list:
         raise FileFormatError(msg_empty)
 
 
-def parse_possible_goals(lines: list, goals_dict: dict = None) -> list:
+def parse_possible_goals(lines: Iterable[str], goals_dict: dict = None) -> list:
     """Parse a list of goals."""
     msg_empty='Possible goals list is empty.'
     
@@ -304,24 +422,29 @@ def parse_possible_goals(lines: list, goals_dict: dict = None) -> list:
         raise FileFormatError(msg_empty)
 
 
-def parse_file(read_file: str, content_type: int, dictionary: dict = None):
-    """Parse different input files."""
+def parse_file(read_file: str, content_type: int, dictionary: dict = None,
+               data: bytes = None):
+    """Parse different input files; data is the file content, if already in memory."""
     msg_empty = f'File {read_file} is empty.'
     msg_index = f'Content type {content_type} is unknown.' 
     
     elements = list()
     
-    lines = load_file(read_file)
-    if len(lines) == 0:
-        raise FileFormatError(msg_empty)
-    if content_type == C.OBSERVATIONS:
-        elements = parse_observations(lines, dictionary)
-    elif content_type == C.POSSIBLE_GOALS:
-        elements = parse_possible_goals(lines, dictionary)
-    elif content_type == C.CORRECT_GOAL:
-        elements = parse_correct_goal(lines[0], dictionary)
-    else:
-        raise UnknownIndexError(msg_index)
+    lines = iter_lines(read_file, data)
+    try:
+        first_line = next(lines, None)
+        if first_line is None:
+            raise FileFormatError(msg_empty)
+        if content_type == C.OBSERVATIONS:
+            elements = parse_observations(itertools.chain((first_line,), lines), dictionary)
+        elif content_type == C.POSSIBLE_GOALS:
+            elements = parse_possible_goals(itertools.chain((first_line,), lines), dictionary)
+        elif content_type == C.CORRECT_GOAL:
+            elements = parse_correct_goal(first_line, dictionary)
+        else:
+            raise UnknownIndexError(msg_index)
+    finally:
+        lines.close()
     
     if len(elements) > 0:    
         return elements
@@ -333,93 +456,135 @@ def parse_file(read_file: str, content_type: int, dictionary: dict = None):
 # Model Related Methods
 # ============================================================================
 
+# Attribute of C holding the loaded model of each domain
+_MODEL_ATTRS = {C.LOGISTICS: 'MODEL_LOGISTICS',
+                C.SATELLITE: 'MODEL_SATELLITE',
+                C.DEPOTS: 'MODEL_DEPOTS',
+                C.BLOCKSWORLD: 'MODEL_BLOCKSWORLS',
+                C.DRIVERLOG: 'MODEL_DRIVERLOG',
+                C.ZENOTRAVEL: 'MODEL_ZENOTRAVEL'}
+
+_DOMAIN_INFO = {C.LOGISTICS: {'max_plan_len' : 50, 'name' : 'logistics'},
+                C.SATELLITE: {'max_plan_len' : 40, 'name' : 'satellite'},
+                C.ZENOTRAVEL: {'max_plan_len' : 40, 'name' : 'zenotravel'},
+                C.BLOCKSWORLD: {'max_plan_len' : 75, 'name' : 'blocksworld'},
+                C.DRIVERLOG: {'max_plan_len' : 70, 'name' : 'driverlog'},
+                C.DEPOTS: {'max_plan_len' : 64, 'name' : 'depots'}}
+
+# Accepts both the domain name and its index as a string
+_DOMAIN_MAP = {key: d for d, v in _DOMAIN_INFO.items() for key in (v['name'], str(d))}
+
+
 def parse_domain(domain: Union[str, int]) -> int:
     """Converts domain name into integer."""
-    msg = (f'Provided domain {domain} is not supported. '+
-           f'Supported domains are: {C.SATELLITE} : satellite, ' +
-           f'{C.LOGISTICS} : logistics, {C.BLOCKSWORLD} : blocksworld, ' +
-           f'{C.ZENOTRAVEL} : zenotravel, {C.DRIVERLOG}: driverlog,' + 
-           f'{C.DEPOTS}: depots.')
-           
-    if (str(domain).isdigit() and int(domain) == C.SATELLITE) or str(domain).lower().strip() == 'satellite':
-        return C.SATELLITE
-    elif (str(domain).isdigit() and int(domain) == C.LOGISTICS) or str(domain).lower().strip() == 'logistics':
-        return C.LOGISTICS
-    elif (str(domain).isdigit() and int(domain) == C.BLOCKSWORLD) or str(domain).lower().strip() == 'blocksworld':
-        return C.BLOCKSWORLD
-    elif (str(domain).isdigit() and int(domain) == C.ZENOTRAVEL) or str(domain).lower().strip() == 'zenotravel':
-        return C.ZENOTRAVEL
-    elif (str(domain).isdigit() and int(domain) == C.DRIVERLOG) or str(domain).lower().strip() == 'driverlog':
-        return C.DRIVERLOG
-    elif (str(domain).isdigit() and int(domain) == C.DEPOTS) or str(domain).lower().strip() == 'depots':
-        return C.DEPOTS
-    else:
-        raise KeyError(msg)
+    key = str(domain).lower().strip()
+    if key.isdigit():
+        key = str(int(key))
+    try:
+        return _DOMAIN_MAP[key]
+    except KeyError:
+        msg = (f'Provided domain {domain} is not supported. '+
+               f'Supported domains are: {C.SATELLITE} : satellite, ' +
+               f'{C.LOGISTICS} : logistics, {C.BLOCKSWORLD} : blocksworld, ' +
+               f'{C.ZENOTRAVEL} : zenotravel, {C.DRIVERLOG}: driverlog,' + 
+               f'{C.DEPOTS}: depots.')
+        raise KeyError(msg) from None
 
 
 def get_model(domain: int):
     """Loads the model for a specific domain."""
-    msg = (f'Provided domain {domain} is not supported. '+
-       f'Supported domains are: {C.SATELLITE} : satellite, ' +
-       f'{C.LOGISTICS} : logistics, {C.BLOCKSWORLD} : blocksworld, ' +
-       f'{C.ZENOTRAVEL} : zenotravel, {C.DRIVERLOG}: driverlog,' + 
-       f'{C.DEPOTS}: depots.')
+    try:
+        return getattr(C, _MODEL_ATTRS[domain])
+    except KeyError:
+        msg = (f'Provided domain {domain} is not supported. '+
+           f'Supported domains are: {C.SATELLITE} : satellite, ' +
+           f'{C.LOGISTICS} : logistics, {C.BLOCKSWORLD} : blocksworld, ' +
+           f'{C.ZENOTRAVEL} : zenotravel, {C.DRIVERLOG}: driverlog,' + 
+           f'{C.DEPOTS}: depots.')
+        raise KeyError(msg) from None
+
+
+class TFLiteModel:
+    """Minimal predict() wrapper around a tf.lite.Interpreter."""
+    def __init__(self, model_path: str):
+        self.interpreter = tf.lite.Interpreter(model_path=model_path)
+        self.interpreter.allocate_tensors()
+        self.input_details = self.interpreter.get_input_details()[0]
+        self.output_details = self.interpreter.get_output_details()[0]
+
+    def predict(self, model_input) -> np.ndarray:
+        model_input = np.asarray(model_input, dtype=self.input_details['dtype'])
+        if tuple(self.input_details['shape']) != model_input.shape:
+            self.interpreter.resize_tensor_input(self.input_details['index'], model_input.shape)
+            self.interpreter.allocate_tensors()
+            self.input_details = self.interpreter.get_input_details()[0]
+            self.output_details = self.interpreter.get_output_details()[0]
+        self.interpreter.set_tensor(self.input_details['index'], model_input)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_details['index'])
+
+    def __call__(self, model_input, training: bool = False) -> np.ndarray:
+        return self.predict(model_input)
+
+
+def quantize_model(h5_path: str, tflite_path: str) -> None:
+    """Convert a Keras model to a TF-Lite model with int8 weights."""
+    model = load_model(h5_path, custom_objects=C.CUSTOM_OBJECTS)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    # Dynamic range quantization: int8 weights, no calibration dataset needed
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    with open(tflite_path, 'wb') as wf:
+        wf.write(converter.convert())
+
+
+def to_mixed_precision(model):
+    """
+    Rebuild a Keras model with float16 computations and the same weights.
     
-    if domain == C.LOGISTICS:
-        return C.MODEL_LOGISTICS
-    elif domain == C.SATELLITE:
-        return C.MODEL_SATELLITE
-    elif domain == C.DEPOTS:
-        return C.MODEL_DEPOTS
-    elif domain == C.BLOCKSWORLD:
-        return C.MODEL_BLOCKSWORLS
-    elif domain == C.DRIVERLOG:
-        return C.MODEL_DRIVERLOG
-    elif domain == C.ZENOTRAVEL:
-        return C.MODEL_ZENOTRAVEL
-    else:
-        raise KeyError(msg)
+    Every layer but the input and the output one gets the 'mixed_float16'
+    policy (float32 variables, float16 math); the output layer stays float32
+    so the predicted probabilities keep their precision. Only worth it on
+    GPUs with float16 support, it is slower on CPU.
+    """
+    config = model.get_config()
+    layers = config['layers']
+    for layer in layers:
+        if layer['class_name'] != 'InputLayer':
+            layer['config']['dtype'] = 'mixed_float16'
+    layers[-1]['config']['dtype'] = 'float32'
+    mixed_model = type(model).from_config(config, custom_objects=C.CUSTOM_OBJECTS)
+    mixed_model.set_weights(model.get_weights())
+    return mixed_model
+
+
+def load_domain_model(model_path: str, mixed_precision: bool = False):
+    """
+    Load a model, preferring the quantized .tflite version if present.
+    
+    With mixed_precision the Keras model is rebuilt by to_mixed_precision;
+    it does not apply to .tflite models.
+    """
+    tflite_path = os.path.splitext(model_path)[0] + '.tflite'
+    if os.path.exists(tflite_path):
+        return TFLiteModel(tflite_path)
+    model = load_model(model_path, custom_objects=C.CUSTOM_OBJECTS)
+    if mixed_precision:
+        model = to_mixed_precision(model)
+    return model
 
 
+@functools.lru_cache(maxsize=None)
 def get_domain_related(domain: int, element: int, model_type: int = C.SMALL, 
                        percentage: float = 0) -> Union[int, str]:
     """Returns domain related information."""
-    msg = (f'Provided domain {domain} is not supported. '+
-           f'Supported domains are: {C.SATELLITE} : satellite, ' +
-           f'{C.LOGISTICS} : logistics, {C.BLOCKSWORLD} : blocksworld, ' +
-           f'{C.ZENOTRAVEL} : zenotravel.')
-    if domain == C.LOGISTICS:
-        v = {
-            'max_plan_len' : 50,
-            'name' : 'logistics',
-        }
-    elif domain == C.SATELLITE:
-        v = {
-            'max_plan_len' : 40,
-            'name' : 'satellite',
-        }
-    elif domain == C.ZENOTRAVEL:
-        v = {
-            'max_plan_len' : 40,
-            'name' : 'zenotravel',
-        }
-    elif domain == C.BLOCKSWORLD:
-        v = {
-            'max_plan_len' : 75,
-            'name' : 'blocksworld',
-        }
-    elif domain == C.DRIVERLOG:
-        v = {
-            'max_plan_len' : 70,
-            'name' : 'driverlog',
-        }
-    elif domain == C.DEPOTS:
-        v = {
-            'max_plan_len' : 64,
-            'name' : 'depots'
-        }
-    else:
-        raise KeyError(msg)
+    try:
+        v = _DOMAIN_INFO[domain]
+    except KeyError:
+        msg = (f'Provided domain {domain} is not supported. '+
+               f'Supported domains are: {C.SATELLITE} : satellite, ' +
+               f'{C.LOGISTICS} : logistics, {C.BLOCKSWORLD} : blocksworld, ' +
+               f'{C.ZENOTRAVEL} : zenotravel.')
+        raise KeyError(msg) from None
         
     if element == C.MAX_PLAN_LENGTH:
         return int(v['max_plan_len']*C.MAX_PLAN_PERCENTAGE)
@@ -436,35 +601,98 @@ def get_domain_related(domain: int, element: int, model_type: int = C.SMALL,
         return join(C.DICTIONARIES_DIR, f'{v["name"]}')
 
 
+@functools.lru_cache(maxsize=None)
+def get_domain_name(domain: int) -> str:
+    """Returns the domain name (e.g. 'blocksworld'), the prefix of its model files."""
+    return get_domain_related(domain, C.MODEL_FILE).split('_')[0]
+
+
 # ============================================================================
 # Domain Component Methods
 # ============================================================================
 
 #* modified to get last n action if plan too long (instead of first n actions)
-def get_observations_array(observations: list, max_plan_length: int) -> np.ndarray:
-    """Create an array of observations index."""
+def get_observations_batch(observations_list: list, max_plan_length: int) -> np.ndarray:
+    """Create a (B, max_plan_length) array of observations index, one row per trace."""
     WARNING_MSG = (f'The action trace is too long. Only the last {max_plan_length} '+
                  f'actions will be considered.')
     
-    observations_array = np.zeros((1, max_plan_length))
-    if len(observations) > max_plan_length:
-        print(WARNING_MSG)
-        observations = observations[::-1]
-    for index, observation in enumerate(observations):
-        if index < max_plan_length:
-            observations_array[0][index] = int(observation)
+    # Action indexes: int32 is enough and takes half the memory of float64
+    observations_array = np.zeros((len(observations_list), max_plan_length), dtype=np.int32)
+    for row, observations in enumerate(observations_list):
+        if len(observations) > max_plan_length:
+            print(WARNING_MSG)
+            observations = observations[::-1]
+        n = min(len(observations), max_plan_length)
+        observations_array[row, :n] = np.asarray(observations[:n], dtype=np.int32)
     return observations_array
+
+
+def get_observations_array(observations: list, max_plan_length: int) -> np.ndarray:
+    """Create an array of observations index."""
+    return get_observations_batch([observations], max_plan_length)
         
 
+def get_predictions_batch(observations_list: list, 
+                          max_plan_length: int, 
+                          domain: int) -> np.ndarray:
+    """Return the model predictions for many traces with a single forward pass."""
+    # Traced once per model: the signature fixes the padded length and
+    # leaves the batch size free, so any batch reuses the same graph
+    infer = _get_infer_function(domain, max_plan_length)
+    
+    # The models take float32 inputs: cast once here instead of inside the model
+    model_input = tf.cast(get_observations_batch(observations_list, max_plan_length), tf.float32)
+    return np.asarray(infer(model_input))
+
+
+# Compiled inference functions per domain: {domain: (model, tf.function)}
+_INFER_FUNCTIONS = {}
+
+
+def clear_inference_cache() -> None:
+    """Drop the compiled inference functions (and their model references)."""
+    _INFER_FUNCTIONS.clear()
+
+
+def _get_infer_function(domain: int, max_plan_length: int):
+    """Return a tf.function with a fixed input signature for the domain model."""
+    model = get_model(domain)
+    if isinstance(model, TFLiteModel):
+        return model
+    cached = _INFER_FUNCTIONS.get((domain, max_plan_length))
+    if cached is None or cached[0] is not model:
+        infer = tf.function(lambda x: model(x, training=False),
+                            input_signature=[tf.TensorSpec([None, max_plan_length], tf.float32)])
+        cached = _INFER_FUNCTIONS[(domain, max_plan_length)] = (model, infer)
+    return cached[1]
+
+
+def get_predictions_dataset(observations_list: list, 
+                            max_plan_length: int, 
+                            domain: int,
+                            batch_size: int = 64) -> np.ndarray:
+    """Return the model predictions for many traces, in batches through tf.data."""
+    if len(observations_list) == 0:
+        return np.empty((0, 0), dtype=np.float32)
+    infer = _get_infer_function(domain, max_plan_length)
+    
+    model_input = tf.cast(get_observations_batch(observations_list, max_plan_length), tf.float32)
+    dataset = (tf.data.Dataset.from_tensor_slices(model_input)
+               .batch(batch_size)
+               .prefetch(tf.data.AUTOTUNE))
+    
+    # Single device-to-host transfer at the end
+    outputs = [infer(batch) for batch in dataset]
+    return tf.concat(outputs, axis=0).numpy()
+
+
 def get_predictions(observations: list, 
                     max_plan_length: int, 
                     domain: int) -> np.ndarray:
     """Return the model predictions."""
-    model = get_model(domain)
-    
-    model_input = tf.convert_to_tensor(get_observations_array(observations, max_plan_length))
-    y_pred = model.predict(model_input)
-    return y_pred
+    # Direct call: model.predict() sets up a whole batched loop for a single row
+    return get_predictions_batch([observations], max_plan_length, domain)
 
 
 # ============================================================================
@@ -473,54 +701,73 @@ def get_predictions(observations: list,
 
 def get_score(prediction: np.ndarray, possible_goal: list) -> float:
     """Returns the score for a possible goal."""
-    score=0
-    
-    for index in possible_goal:
-        score += prediction[0][int(index)]
-    return score
+    indexes = np.fromiter(map(int, possible_goal), dtype=np.intp, count=len(possible_goal))
+    return prediction[0][indexes].sum()
 
 
 def get_scores(prediction: np.ndarray, possible_goals: list) -> np.ndarray:
     """Returns the scores for all possible goals."""
-    scores = np.zeros((len(possible_goals, )), dtype=float)
-    for index, possible_goal in enumerate(possible_goals):
-        scores[index] = get_score(prediction, possible_goal)
-    return scores
+    if len(possible_goals) == 0:
+        return np.zeros(0, dtype=float)
+    # All the goals flattened in one index array (CSR-style), one segment per goal
+    lengths = np.fromiter(map(len, possible_goals), dtype=np.intp, count=len(possible_goals))
+    indexes = np.fromiter(map(int, itertools.chain.from_iterable(possible_goals)),
+                          dtype=np.intp, count=int(lengths.sum()))
+    # One bin per goal: empty goals get no entries and score 0, like the
+    # original per-goal sum (np.add.reduceat would not give 0 for them)
+    goal_ids = np.repeat(np.arange(len(lengths)), lengths)
+    return np.bincount(goal_ids, weights=prediction[0][indexes],
+                       minlength=len(lengths)).astype(float)
         
 
 def get_max(scores: np.ndarray) -> list:
     """Returns a list with the index (or indexes) of the highest scores."""
-    max_element = -1
-    index_max = list()
-    for i in range(len(scores)):
-        if scores[i] > max_element:
-            max_element = scores[i]
-            index_max = [i]
-        elif scores[i] == max_element:
-            index_max.append(i)
-
-    return index_max
+    scores = np.asarray(scores)
+    if scores.size == 0:
+        return list()
+    return np.flatnonzero(scores == scores.max()).tolist()
     
 
+# Random tie-break between equal top scores, seeded once for reproducible runs
+_TIE_BREAK_RNG = np.random.default_rng(0)
+
+
+def _pick_max(idx_max_list: list) -> int:
+    """Chooses one of the indexes of the highest scores, at random if tied."""
+    if len(idx_max_list) == 1:
+        return idx_max_list[0]
+    return idx_max_list[_TIE_BREAK_RNG.integers(0, len(idx_max_list))]
+
+
 def get_result(scores: np.ndarray, correct_goal: int) -> bool:
     """Computes if the goal recognition task is successful."""
-    idx_max_list = get_max(scores)
-    if len(idx_max_list) == 1:
-        idx_max = idx_max_list[0]
-    else:
-        idx_max = idx_max_list[np.random.randint(0, len(idx_max_list))]
+    idx_max = _pick_max(get_max(scores))
     if idx_max == correct_goal:
         return True
     else:
         return False
+
+
+def score_and_decide(prediction: np.ndarray, possible_goals: list, correct_goal: int) -> tuple:
+    """
+    Scores the possible goals and decides the task in one pass.
+    
+    Same as get_result(get_scores(...)) plus get_max(...)[0], with the top
+    scores searched only once.
+    
+    Returns:
+        Tuple of (success, index of the first highest score)
+    """
+    idx_max_list = get_max(get_scores(prediction, possible_goals))
+    return _pick_max(idx_max_list) == correct_goal, idx_max_list[0]
     
 
 def get_correct_goal_idx(correct_goal: list, possible_goals: list) -> int:
     """Computes the correct goal index."""
+    # Goals are compared as sorted tuples (order independent, keeps duplicates)
+    correct_key = tuple(sorted(correct_goal))
     for index, possible_goal in enumerate(possible_goals):
-        possible_goal = np.sort(possible_goal)
-        correct_goal = np.sort(correct_goal)
-        if np.all(possible_goal == correct_goal):
+        if len(possible_goal) == len(correct_key) and tuple(sorted(possible_goal)) == correct_key:
             return index
     return None
 
@@ -529,16 +776,41 @@ def get_correct_goal_idx(correct_goal: list, possible_goals: list) -> int:
 # Noisy Mask Methods
 # ============================================================================
 
-def load_mask_file(mask_file_path: str) -> dict:
-    """Load a mask file containing noisy observations."""
-    with open(mask_file_path, 'r') as f:
-        return json.load(f)
+@functools.lru_cache(maxsize=8)
+def _load_mask_file_cached(mask_file_path: str, mtime_ns: int, size: int,
+                           fields: Union[tuple, None]) -> dict:
+    """Parse a mask file; cached on path, modification time, size and fields."""
+    with open(mask_file_path, 'rb') as f:
+        mask_data = _json_loads(f.read())
+    if fields is not None:
+        # Keep only the requested fields, the rest is freed right away
+        mask_data = {problem: {k: entry[k] for k in fields}
+                     for problem, entry in mask_data.items()}
+    return mask_data
 
 
-def apply_mask(observations: list, problem_file: str, mask_data: dict) -> list:
+def load_mask_file(mask_file_path: str, fields: Union[tuple, None] = None) -> dict:
+    """
+    Load a mask file containing noisy observations.
+    
+    If fields is given (e.g. ('obs',)), each problem entry keeps only those keys.
+    The parsed dict is cached and shared between calls: do not modify it.
+    """
+    mask_file_path = os.path.abspath(mask_file_path)
+    stat = os.stat(mask_file_path)
+    if fields is not None:
+        fields = tuple(fields)
+    return _load_mask_file_cached(mask_file_path, stat.st_mtime_ns, stat.st_size, fields)
+
+
+def apply_mask(observations: Union[list, None], problem_file: str, mask_data: dict) -> list:
     """
     Apply a noisy mask to observations if available.
     
+    The mask file stores the whole noisy trace, which replaces observations:
+    the lookup is a single dict access, and observations may be None when
+    the caller has not parsed them.
+    
     Raises:
         KeyError: If problem_file is not found in mask_data
     """
@@ -551,7 +823,7 @@ def apply_mask(observations: list, problem_file: str, mask_data: dict) -> list:
 
 def get_mask_path(domain: int, percentage_dir: str, noise_level: int) -> str:
     """Get the path to the mask file for a given domain, percentage, and noise level."""
-    domain_name = get_domain_related(domain, C.MODEL_FILE).split('_')[0]
+    domain_name = get_domain_name(domain)
     mask_base_dir = '../data/validator_testset/noisy_masks'
     mask_file = f'{noise_level}_mask.json'
     return join(mask_base_dir, domain_name, percentage_dir, mask_file)
@@ -8,7 +8,15 @@ in the 10%, 20%, and 30% mask files.
 import os
 import json
 from os.path import join
-from typing import Dict, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+try:
+    # orjson parses the multi-MB mask files several times faster than json;
+    # its JSONDecodeError is a subclass of json.JSONDecodeError
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
 
 # Configuration
 DOMAINS = ['blocksworld', 'logistics', 'satellite', 'zenotravel', 'driverlog', 'depots']
@@ -18,15 +26,15 @@ BASE_DATA_DIR = '../data'
 MASK_BASE_DIR = '../data/validator_testset/noisy_masks'
 
 
-def load_mask_file(mask_path: str) -> Dict:
-    """Load a mask JSON file."""
+def load_mask_file(mask_path: str, log: Callable[[str], None] = print) -> Dict:
+    """Load a mask JSON file; parse errors are reported through log."""
     try:
-        with open(mask_path, 'r') as f:
-            return json.load(f)
+        with open(mask_path, 'rb') as f:
+            return _json_loads(f.read())
     except FileNotFoundError:
         return None
     except json.JSONDecodeError as e:
-        print(f"  ⚠ Error parsing {mask_path}: {e}")
+        log(f"  ⚠ Error parsing {mask_path}: {e}")
         return None
 
 
@@ -41,16 +49,20 @@ def get_problem_files(domain_dir: str, obs_perc: int) -> List[str]:
     return [f for f in files if f.endswith('.zip') or f.endswith('.tar.bz2')]
 
 
-def check_domain(domain: str) -> Tuple[bool, Dict]:
+def check_domain(domain: str, log: Callable[[str], None] = print) -> Tuple[bool, Dict]:
     """
     Check if all problems have masks for all noise levels.
     
+    Args:
+        domain: Domain name
+        log: Function receiving each output line (default: print)
+    
     Returns:
         Tuple of (all_ok, report) where report contains detailed information
     """
-    print(f"\n{'='*60}")
-    print(f"Checking domain: {domain.upper()}")
-    print(f"{'='*60}")
+    log(f"\n{'='*60}")
+    log(f"Checking domain: {domain.upper()}")
+    log(f"{'='*60}")
     
     domain_dir = join(BASE_DATA_DIR, domain)
     mask_domain_dir = join(MASK_BASE_DIR, domain)
@@ -62,20 +74,20 @@ def check_domain(domain: str) -> Tuple[bool, Dict]:
     }
     
     for obs_perc in OBSERVATION_PERCENTAGES:
-        print(f"\n--- {obs_perc}% observations ---")
+        log(f"\n--- {obs_perc}% observations ---")
         
         # Get all problem files
         problem_files = get_problem_files(domain_dir, obs_perc)
         
         if not problem_files:
-            print(f"  ⚠ No problem files found in {join(domain_dir, str(obs_perc))}")
+            log(f"  ⚠ No problem files found in {join(domain_dir, str(obs_perc))}")
             report['observation_percentages'][obs_perc] = {
                 'status': 'no_problems',
                 'problem_count': 0
             }
             continue
         
-        print(f"  Found {len(problem_files)} problem files")
+        log(f"  Found {len(problem_files)} problem files")
         
         obs_report = {
             'problem_count': len(problem_files),
@@ -87,10 +99,10 @@ def check_domain(domain: str) -> Tuple[bool, Dict]:
             mask_file = join(mask_domain_dir, str(obs_perc), f'{noise}_mask.json')
             
             # Load mask file
-            mask_data = load_mask_file(mask_file)
+            mask_data = load_mask_file(mask_file, log)
             
             if mask_data is None:
-                print(f"  ✗ {noise}% mask file NOT FOUND: {mask_file}")
+                log(f"  ✗ {noise}% mask file NOT FOUND: {mask_file}")
                 obs_report['noise_levels'][noise] = {
                     'status': 'missing_file',
                     'missing_problems': problem_files
@@ -99,14 +111,12 @@ def check_domain(domain: str) -> Tuple[bool, Dict]:
                 continue
             
             # Check which problems are missing from mask
-            missing_problems = []
-            for problem_file in problem_files:
-                if problem_file not in mask_data:
-                    missing_problems.append(problem_file)
+            mask_keys = mask_data.keys()
+            missing_problems = [p for p in problem_files if p not in mask_keys]
             
             if missing_problems:
-                print(f"  ✗ {noise}% mask: {len(missing_problems)} problems missing")
-                print(f"    First 5 missing: {missing_problems[:5]}")
+                log(f"  ✗ {noise}% mask: {len(missing_problems)} problems missing")
+                log(f"    First 5 missing: {missing_problems[:5]}")
                 obs_report['noise_levels'][noise] = {
                     'status': 'incomplete',
                     'problems_in_mask': len(mask_data),
@@ -115,7 +125,7 @@ def check_domain(domain: str) -> Tuple[bool, Dict]:
                 }
                 all_ok = False
             else:
-                print(f"  ✓ {noise}% mask: All {len(problem_files)} problems present")
+                log(f"  ✓ {noise}% mask: All {len(problem_files)} problems present")
                 obs_report['noise_levels'][noise] = {
                     'status': 'complete',
                     'problems_in_mask': len(mask_data)
@@ -126,6 +136,13 @@ def check_domain(domain: str) -> Tuple[bool, Dict]:
     return all_ok, report
 
 
+def _check_domain_task(domain: str) -> Tuple[bool, Dict, List[str]]:
+    """Run check_domain in a worker process, collecting its output lines."""
+    lines = []
+    ok, report = check_domain(domain, log=lines.append)
+    return ok, report, lines
+
+
 def main():
     """Main function to check all domains."""
     print('='*60)
@@ -141,10 +158,16 @@ def main():
     domains_ok = []
     domains_issues = []
     
-    # Check each domain
+    # Check the domains in parallel, one process per domain
+    max_workers = min(len(DOMAINS), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {domain: executor.submit(_check_domain_task, domain) for domain in DOMAINS}
+    
+    # Print the output of each domain in order, after all checks are done
     for domain in DOMAINS:
         try:
-            ok, report = check_domain(domain)
+            ok, report, lines = futures[domain].result()
+            print('\n'.join(lines))
             all_reports[domain] = report
             
             if ok:
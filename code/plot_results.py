@@ -10,6 +10,8 @@ Usage:
 import os
 import argparse
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')  # Only files are written: skip GUI backend selection
 import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
@@ -21,6 +23,15 @@ sns.set_style("whitegrid")
 sns.set_palette("husl")
 plt.rcParams['figure.figsize'] = (12, 8)
 plt.rcParams['font.size'] = 10
+# Fixed margins for every figure, instead of a tight_layout() pass before each
+# save (bbox_inches='tight' still crops the saved image to its content)
+plt.rcParams.update({'figure.subplot.left': 0.1, 'figure.subplot.right': 0.95,
+                     'figure.subplot.top': 0.92, 'figure.subplot.bottom': 0.12})
+
+# Columns of the summary_by_perc CSV files read by the plots, with their dtypes
+RESULT_DTYPES = {'noise_level': np.int32,
+                 'observation_percentage': np.int32,
+                 'accuracy': np.float64}
 
 
 def load_results(results_dir: str) -> dict:
@@ -52,8 +63,8 @@ def load_results(results_dir: str) -> dict:
         if len(parts) >= 2:
             domain = parts[1]
             
-            # Load the CSV
-            df = pd.read_csv(csv_file)
+            # Load the CSV, parsing only the columns used by the plots with fixed dtypes
+            df = pd.read_csv(csv_file, usecols=list(RESULT_DTYPES), dtype=RESULT_DTYPES)
             results[domain] = df
             print(f"Loaded {domain}: {len(df)} rows")
     
@@ -65,14 +76,14 @@ def plot_accuracy_vs_noise(results: dict, output_dir: str):
     Plot accuracy vs noise level for each observation percentage.
     Creates one plot per domain.
     """
+    # One figure for all domains, cleared at each iteration
+    fig, ax = plt.subplots(figsize=(12, 8))
+    
     for domain, df in results.items():
-        fig, ax = plt.subplots(figsize=(12, 8))
-        
-        # Get unique observation percentages
-        obs_percentages = sorted(df['observation_percentage'].unique())
+        ax.cla()
         
-        for obs_perc in obs_percentages:
-            data = df[df['observation_percentage'] == obs_perc].sort_values('noise_level')
+        # Sort once, then one group per observation percentage (sorted keys)
+        for obs_perc, data in df.sort_values('noise_level').groupby('observation_percentage', sort=True):
             ax.plot(data['noise_level'], data['accuracy'], 
                    marker='o', linewidth=2, markersize=8,
                    label=f'{obs_perc}% observations')
@@ -87,10 +98,10 @@ def plot_accuracy_vs_noise(results: dict, output_dir: str):
         
         # Save plot
         output_file = os.path.join(output_dir, f'{domain}_accuracy_vs_noise.png')
-        plt.tight_layout()
-        plt.savefig(output_file, dpi=300, bbox_inches='tight')
+        fig.savefig(output_file, dpi=300, bbox_inches='tight')
         print(f"Saved: {output_file}")
-        plt.close()
+    
+    plt.close(fig)
 
 
 def plot_accuracy_vs_observations(results: dict, output_dir: str):
@@ -98,14 +109,14 @@ def plot_accuracy_vs_observations(results: dict, output_dir: str):
     Plot accuracy vs observation percentage for each noise level.
     Creates one plot per domain.
     """
+    # One figure for all domains, cleared at each iteration
+    fig, ax = plt.subplots(figsize=(12, 8))
+    
     for domain, df in results.items():
-        fig, ax = plt.subplots(figsize=(12, 8))
+        ax.cla()
         
-        # Get unique noise levels
-        noise_levels = sorted(df['noise_level'].unique())
-        
-        for noise in noise_levels:
-            data = df[df['noise_level'] == noise].sort_values('observation_percentage')
+        # Sort once, then one group per noise level (sorted keys)
+        for noise, data in df.sort_values('observation_percentage').groupby('noise_level', sort=True):
             label = 'Clean' if noise == 0 else f'{noise}% noise'
             ax.plot(data['observation_percentage'], data['accuracy'], 
                    marker='o', linewidth=2, markersize=8,
@@ -121,10 +132,10 @@ def plot_accuracy_vs_observations(results: dict, output_dir: str):
         
         # Save plot
         output_file = os.path.join(output_dir, f'{domain}_accuracy_vs_observations.png')
-        plt.tight_layout()
-        plt.savefig(output_file, dpi=300, bbox_inches='tight')
+        fig.savefig(output_file, dpi=300, bbox_inches='tight')
         print(f"Saved: {output_file}")
-        plt.close()
+    
+    plt.close(fig)
 
 
 def plot_heatmap(results: dict, output_dir: str):
@@ -132,14 +143,18 @@ def plot_heatmap(results: dict, output_dir: str):
     Create heatmap of accuracy for each domain.
     Rows: observation percentages, Columns: noise levels
     """
+    # One figure for all domains, cleared at each iteration
+    fig = plt.figure(figsize=(10, 8))
+    
     for domain, df in results.items():
         # Pivot data to create matrix
         pivot_data = df.pivot(index='observation_percentage', 
                              columns='noise_level', 
                              values='accuracy')
         
-        # Create heatmap
-        fig, ax = plt.subplots(figsize=(10, 8))
+        # Create heatmap (clf also removes the previous colorbar)
+        fig.clf()
+        ax = fig.add_subplot()
         sns.heatmap(pivot_data, annot=True, fmt='.1f', cmap='RdYlGn',
                    vmin=0, vmax=100, cbar_kws={'label': 'Accuracy (%)'},
                    linewidths=0.5, ax=ax)
@@ -151,10 +166,10 @@ def plot_heatmap(results: dict, output_dir: str):
         
         # Save plot
         output_file = os.path.join(output_dir, f'{domain}_heatmap.png')
-        plt.tight_layout()
-        plt.savefig(output_file, dpi=300, bbox_inches='tight')
+        fig.savefig(output_file, dpi=300, bbox_inches='tight')
         print(f"Saved: {output_file}")
-        plt.close()
+    
+    plt.close(fig)
 
 
 def plot_all_domains_comparison(results: dict, output_dir: str, obs_perc: int = 100):
@@ -181,10 +196,9 @@ def plot_all_domains_comparison(results: dict, output_dir: str, obs_perc: int =
     
     # Save plot
     output_file = os.path.join(output_dir, f'all_domains_comparison_{obs_perc}pct.png')
-    plt.tight_layout()
-    plt.savefig(output_file, dpi=300, bbox_inches='tight')
+    fig.savefig(output_file, dpi=300, bbox_inches='tight')
     print(f"Saved: {output_file}")
-    plt.close()
+    plt.close(fig)
 
 
 def plot_degradation_analysis(results: dict, output_dir: str):
@@ -192,23 +206,30 @@ def plot_degradation_analysis(results: dict, output_dir: str):
     Plot accuracy degradation (difference from clean) vs noise level.
     Shows how much accuracy drops with noise.
     """
+    # One figure for all domains, cleared at each iteration
+    fig, ax = plt.subplots(figsize=(12, 8))
+    
     for domain, df in results.items():
-        fig, ax = plt.subplots(figsize=(12, 8))
+        ax.cla()
         
-        # Get unique observation percentages
-        obs_percentages = sorted(df['observation_percentage'].unique())
+        # Accuracy matrix: rows observation percentages, columns noise levels (sorted)
+        pivot_data = df.pivot(index='observation_percentage', 
+                             columns='noise_level', 
+                             values='accuracy')
         
-        for obs_perc in obs_percentages:
-            data = df[df['observation_percentage'] == obs_perc].sort_values('noise_level')
+        if 0 in pivot_data.columns:
+            noise_levels = pivot_data.columns.to_numpy()
+            accuracy = pivot_data.to_numpy()
             
-            if len(data) > 0 and 0 in data['noise_level'].values:
-                # Get clean accuracy (noise_level = 0)
-                clean_accuracy = data[data['noise_level'] == 0]['accuracy'].values[0]
-                
-                # Calculate degradation
-                degradation = clean_accuracy - data['accuracy']
-                
-                ax.plot(data['noise_level'], degradation, 
+            # Degradation from clean (noise_level = 0) for every row in one subtraction
+            degradation = accuracy[:, [pivot_data.columns.get_loc(0)]] - accuracy
+            
+            for obs_perc, row_accuracy, row_degradation in zip(pivot_data.index, accuracy, degradation):
+                # Skip rows without clean accuracy; drop noise levels missing for this row
+                present = ~np.isnan(row_accuracy)
+                if np.isnan(row_degradation).all():
+                    continue
+                ax.plot(noise_levels[present], row_degradation[present], 
                        marker='o', linewidth=2, markersize=8,
                        label=f'{obs_perc}% observations')
         
@@ -222,10 +243,10 @@ def plot_degradation_analysis(results: dict, output_dir: str):
         
         # Save plot
         output_file = os.path.join(output_dir, f'{domain}_degradation.png')
-        plt.tight_layout()
-        plt.savefig(output_file, dpi=300, bbox_inches='tight')
+        fig.savefig(output_file, dpi=300, bbox_inches='tight')
         print(f"Saved: {output_file}")
-        plt.close()
+    
+    plt.close(fig)
 
 
 def plot_bar_comparison(results: dict, output_dir: str, noise_level: int = 30):
@@ -242,13 +263,18 @@ def plot_bar_comparison(results: dict, output_dir: str, noise_level: int = 30):
     x = np.arange(len(obs_percentages))
     width = 0.12
     
+    # (domains x observation percentages) accuracy matrix, NaN where missing
+    acc_mat = np.full((len(domains), len(obs_percentages)), np.nan)
     for idx, domain in enumerate(domains):
         df = results[domain]
-        data = df[df['noise_level'] == noise_level].sort_values('observation_percentage')
-        
-        if len(data) > 0:
+        data = df[df['noise_level'] == noise_level]
+        acc_mat[idx] = (data.set_index('observation_percentage')['accuracy']
+                        .reindex(obs_percentages).to_numpy())
+    
+    for idx, domain in enumerate(domains):
+        if not np.isnan(acc_mat[idx]).all():
             offset = width * (idx - len(domains)/2 + 0.5)
-            ax.bar(x + offset, data['accuracy'], width, 
+            ax.bar(x + offset, acc_mat[idx], width, 
                   label=domain.capitalize())
     
     ax.set_xlabel('Observation Percentage (%)', fontsize=12, fontweight='bold')
@@ -263,10 +289,9 @@ def plot_bar_comparison(results: dict, output_dir: str, noise_level: int = 30):
     
     # Save plot
     output_file = os.path.join(output_dir, f'bar_comparison_{noise_level}pct_noise.png')
-    plt.tight_layout()
-    plt.savefig(output_file, dpi=300, bbox_inches='tight')
+    fig.savefig(output_file, dpi=300, bbox_inches='tight')
     print(f"Saved: {output_file}")
-    plt.close()
+    plt.close(fig)
 
 
 def generate_summary_stats(results: dict, output_dir: str):
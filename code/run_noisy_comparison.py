@@ -5,9 +5,7 @@ Compares performance across clean and noisy observations (10%, 20%, 30% noise).
 """
 
 import numpy as np
-from tensorflow.keras.models import load_model
 from os.path import join
-import pickle
 import time
 import os
 import argparse
@@ -24,8 +22,9 @@ if gpus:
             tf.config.experimental.set_memory_growth(gpu, True)
     except RuntimeError as e:
         print(f"GPU memory growth setting error: {e}")
-import json
 from typing import Union
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import gc
 from keras import backend as K
 import psutil
@@ -33,16 +32,28 @@ import psutil
 # Import all required functions from the notebook
 from GRNet_approach_functions import (
     C, AttentionWeights, ContextVector,
-    parse_domain, get_model, get_domain_related,
-    unzip_file, unpack_bz2,
+    parse_domain, get_model, get_domain_related, get_domain_name, load_domain_model,
+    clear_inference_cache,
+    read_archive,
     load_file, parse_file,
-    get_observations_array, get_predictions,
-    get_scores, get_max, get_result, get_correct_goal_idx,
+    get_predictions, get_predictions_batch,
+    score_and_decide, get_correct_goal_idx,
     load_mask_file, apply_mask, get_mask_path
 )
 
 
-def run_experiment(obs_file: str, 
+# Number of problems per forward pass in run_comparison
+INFERENCE_BATCH_SIZE = 64
+# Worker threads reading and parsing problems: parsing is pure Python and
+# holds the GIL, a few threads are enough to keep ahead of the model
+PREPROCESS_WORKERS = min(4, os.cpu_count() or 1)
+# Number of problems prepared ahead by the worker threads
+PREFETCH_SIZE = 2 * INFERENCE_BATCH_SIZE
+# Files between two explicit gc.collect() calls in run_comparison
+GC_INTERVAL = 1000
+
+
+def prepare_experiment(obs_file: str, 
             goals_dict_file: Union[str, None],
             actions_dict_file: Union[str, None],
             possible_goals_file: str, 
@@ -50,39 +61,176 @@ def run_experiment(obs_file: str,
             domain: Union[str, int], 
             verbose: int = 0,
             mask_data: Union[dict, None] = None,
-            problem_file: Union[str, None] = None) -> list:
-    """Run a single goal recognition experiment."""
+            problem_file: Union[str, None] = None,
+            archive: Union[dict, None] = None,
+            goals_dict: Union[dict, None] = None,
+            actions_dict: Union[dict, None] = None,
+            goals: Union[tuple, None] = None) -> tuple:
+    """
+    Parse the inputs of a goal recognition experiment, without running the model.
+    
+    If archive ({name: bytes}, see read_archive) is given, obs_file,
+    possible_goals_file and correct_goal_file are looked up in it by name
+    instead of being read from disk. goals_dict and actions_dict, if given,
+    are used in place of the dictionary files. goals, if given, is the
+    (possible_goals, correct_goal_idx) pair already parsed for this problem.
+    
+    Returns:
+        Tuple of (observations, possible_goals, correct_goal_idx)
+    """
     
     domain = parse_domain(domain)
-    if goals_dict_file is None:
-        goals_dict_file = join(get_domain_related(domain, C.DICTIONARIES_DICT), 'dizionario_goal')
-    goals_dict = load_file(goals_dict_file, binary=True, use_pickle=True)
-    if actions_dict_file is None:
-        actions_dict_file = join(get_domain_related(domain, C.DICTIONARIES_DICT), 'dizionario')
-    actions_dict = load_file(actions_dict_file, binary=True, use_pickle=True)
-    observations = parse_file(obs_file, C.OBSERVATIONS, actions_dict)
-    
-    # Apply mask if provided
+    if goals_dict is None:
+        if goals_dict_file is None:
+            goals_dict_file = join(get_domain_related(domain, C.DICTIONARIES_DICT), 'dizionario_goal')
+        goals_dict = load_file(goals_dict_file, binary=True, use_pickle=True)
+    if actions_dict is None:
+        if actions_dict_file is None:
+            actions_dict_file = join(get_domain_related(domain, C.DICTIONARIES_DICT), 'dizionario')
+        actions_dict = load_file(actions_dict_file, binary=True, use_pickle=True)
+    if archive is None:
+        archive = {}
+    
+    # Apply mask if provided: the noisy observations replace obs.dat
+    # entirely, so the file is only parsed when there is no mask
     if mask_data is not None and problem_file is not None:
-        observations = apply_mask(observations, problem_file, mask_data)
+        observations = apply_mask(None, problem_file, mask_data)
         if verbose > 1:
             print(f'Applied noisy mask for {problem_file}')
+    else:
+        observations = parse_file(obs_file, C.OBSERVATIONS, actions_dict,
+                                  data=archive.get(obs_file))
     
     if verbose > 1:
         print('Observed actions:\n')
         for o in observations:
             print(o)
-    possible_goals = parse_file(possible_goals_file, C.POSSIBLE_GOALS, goals_dict)
+    if goals is not None:
+        possible_goals, correct_goal_idx = goals
+        return observations, possible_goals, correct_goal_idx
+    
+    possible_goals = parse_file(possible_goals_file, C.POSSIBLE_GOALS, goals_dict,
+                                data=archive.get(possible_goals_file))
+    
+    correct_goal = parse_file(correct_goal_file, C.CORRECT_GOAL, goals_dict,
+                              data=archive.get(correct_goal_file))
+    correct_goal_idx = get_correct_goal_idx(correct_goal, possible_goals)
+    
+    return observations, possible_goals, correct_goal_idx
+
+
+def preprocess_file(archive_path: str, problem_file: str, domain: int,
+                    mask_data: Union[dict, None], goals_dict: dict, actions_dict: dict,
+                    goals: Union[tuple, None] = None) -> tuple:
+    """
+    Read a problem archive in memory and prepare its experiment.
+    
+    Runs in the worker threads of run_comparison. The archive is not read at
+    all when the mask gives the observations and goals is already parsed.
+    
+    Returns:
+        Tuple of (observations, possible_goals, correct_goal_idx, prepare_time);
+        prepare_time is the CPU time of this thread, so it does not grow with
+        the contention between the worker threads
+    """
+    start_time = time.thread_time()
+    if mask_data is not None and goals is not None:
+        archive = {}
+    else:
+        archive = read_archive(archive_path)
+    observations, possible_goals, correct_goal_idx = prepare_experiment(
+        obs_file='obs.dat',
+        goals_dict_file=None,
+        actions_dict_file=None,
+        possible_goals_file='hyps.dat',
+        correct_goal_file='real_hyp.dat',
+        domain=domain,
+        verbose=0,
+        mask_data=mask_data,
+        problem_file=problem_file,
+        archive=archive,
+        goals_dict=goals_dict,
+        actions_dict=actions_dict,
+        goals=goals
+    )
+    return observations, possible_goals, correct_goal_idx, time.thread_time() - start_time
+
+
+def finalize_experiment(predictions: np.ndarray, possible_goals: list, correct_goal_idx: int) -> list:
+    """Score the model predictions (shape (1, n_fluents)) of a prepared experiment."""
+    result, predicted_goal_idx = score_and_decide(predictions, possible_goals, correct_goal_idx)
+    
+    return [result, correct_goal_idx, predicted_goal_idx]
+
+
+def run_experiment(obs_file: str, 
+            goals_dict_file: Union[str, None],
+            actions_dict_file: Union[str, None],
+            possible_goals_file: str, 
+            correct_goal_file: str, 
+            domain: Union[str, int], 
+            verbose: int = 0,
+            mask_data: Union[dict, None] = None,
+            problem_file: Union[str, None] = None,
+            goals_dict: Union[dict, None] = None,
+            actions_dict: Union[dict, None] = None) -> list:
+    """Run a single goal recognition experiment."""
+    
+    domain = parse_domain(domain)
+    observations, possible_goals, correct_goal_idx = prepare_experiment(
+        obs_file, goals_dict_file, actions_dict_file, possible_goals_file,
+        correct_goal_file, domain, verbose, mask_data, problem_file,
+        goals_dict=goals_dict, actions_dict=actions_dict)
     
     max_plan_length = get_domain_related(domain, C.MAX_PLAN_LENGTH)
     predictions = get_predictions(observations, max_plan_length, domain)
-    scores = get_scores(predictions, possible_goals)
     
-    correct_goal = parse_file(correct_goal_file, C.CORRECT_GOAL, goals_dict) 
-    correct_goal_idx = get_correct_goal_idx(correct_goal, possible_goals)
-    result = get_result(scores, correct_goal_idx)
+    return finalize_experiment(predictions, possible_goals, correct_goal_idx)
+
+
+def run_batch(pending: list, domain: int, max_plan_length: int,
+              noise: int, observation_percentage: int) -> list:
+    """
+    Run one forward pass over prepared experiments and score them.
+    
+    Args:
+        pending: List of (problem_file, observations, possible_goals,
+                 correct_goal_idx, prepare_time) tuples
     
-    return [result, correct_goal_idx, get_max(scores)[0]]
+    Returns:
+        List of detailed result rows; execution_time is the preparation plus
+        scoring time of the problem, batch_inference_time its equal share of
+        the batched forward pass (kept apart: it depends on the batch size)
+    """
+    start_time = time.time()
+    try:
+        predictions = get_predictions_batch([p[1] for p in pending], max_plan_length, domain)
+    except Exception as e:
+        print(f'  Error predicting batch of {len(pending)} problems: {e}')
+        return []
+    predict_share = (time.time() - start_time) / len(pending)
+    
+    rows = []
+    for (f, _, possible_goals, correct_goal_idx, prepare_time), prediction in zip(pending, predictions):
+        start_time = time.time()
+        try:
+            result = finalize_experiment(prediction[np.newaxis], possible_goals, correct_goal_idx)
+        except Exception as e:
+            print(f'  Error processing {f}: {e}')
+            continue
+        
+        # Store detailed results
+        rows.append({
+            'noise_level': noise,
+            'observation_percentage': observation_percentage,
+            'problem_file': f,
+            'correct_prediction': result[0],
+            'correct_goal_idx': result[1],
+            'predicted_goal_idx': result[2],
+            'execution_time': prepare_time + (time.time() - start_time),
+            'batch_inference_time': predict_share
+        })
+    return rows
 
 
 def get_memory_usage() -> str:
@@ -93,10 +241,11 @@ def get_memory_usage() -> str:
     return f"{mem_mb:.1f} MB"
 
 
-def load_single_model(domain: int, model_type: int, percentage: float) -> None:
+def load_single_model(domain: int, model_type: int, percentage: float,
+                      mixed_precision: bool = False) -> None:
     """Load only the model for a specific domain."""
     model_file = get_domain_related(domain, C.MODEL_FILE, model_type=model_type, percentage=percentage)
-    model = load_model(join(C.MODELS_DIR, model_file), custom_objects=C.CUSTOM_OBJECTS)
+    model = load_domain_model(join(C.MODELS_DIR, model_file), mixed_precision=mixed_precision)
     
     # Set the appropriate model in C constants
     if domain == C.LOGISTICS:
@@ -112,7 +261,7 @@ def load_single_model(domain: int, model_type: int, percentage: float) -> None:
     elif domain == C.BLOCKSWORLD:
         C.MODEL_BLOCKSWORLS = model
     
-    print(f'✓ Loaded model for domain {get_domain_related(domain, C.MODEL_FILE).split("_")[0]} (Memory: {get_memory_usage()})')
+    print(f'✓ Loaded model for domain {get_domain_name(domain)} (Memory: {get_memory_usage()})')
 
 
 def unload_models() -> None:
@@ -126,6 +275,7 @@ def unload_models() -> None:
     C.MODEL_DEPOTS = None
     C.MODEL_DRIVERLOG = None
     C.MODEL_BLOCKSWORLS = None
+    clear_inference_cache()
     
     # Clear Keras/TensorFlow session
     K.clear_session()
@@ -137,24 +287,35 @@ def unload_models() -> None:
     print(f'✓ Models unloaded and memory cleared (Before: {mem_before} → After: {mem_after})')
 
 
-def run_comparison(domain: int, domain_dir: str, source_dir: str, 
+def run_comparison(domain: int, domain_dir: str,
                    noise_levels: list, observation_percentages: list,
-                   output_dir: str = '.'):
+                   output_dir: str = '.', compress_detailed: bool = False):
     """
     Run comprehensive comparison across different noise levels and observation percentages.
     
     Args:
         domain: Domain constant (e.g., C.BLOCKSWORLD)
         domain_dir: Path to domain data directory
-        source_dir: Temporary directory for unpacking files
         noise_levels: List of noise levels to test (e.g., [0, 10, 20, 30])
         observation_percentages: List of observation percentages (e.g., [0.1, 0.3, 0.5, 0.7, 1.0])
         output_dir: Directory to save output CSV files
+        compress_detailed: Write the detailed results gzip-compressed (.csv.gz)
     """
     
     comparison_results = {}
     detailed_results = []
     
+    max_plan_length = get_domain_related(domain, C.MAX_PLAN_LENGTH)
+    
+    # The dictionaries are the same for every problem of the domain
+    dictionaries_dir = get_domain_related(domain, C.DICTIONARIES_DICT)
+    goals_dict = load_file(join(dictionaries_dir, 'dizionario_goal'), binary=True, use_pickle=True)
+    actions_dict = load_file(join(dictionaries_dir, 'dizionario'), binary=True, use_pickle=True)
+    
+    # Noise only changes the observations: (possible_goals, correct_goal_idx)
+    # of each (percentage, problem file) are parsed once and reused
+    parsed_goals = {}
+    
     for noise in noise_levels:
         print(f'\n{"="*60}')
         print(f'Testing with {noise}% noise')
@@ -162,6 +323,9 @@ def run_comparison(domain: int, domain_dir: str, source_dir: str,
         
         use_noisy_masks = (noise > 0)
         noise_level = noise if noise > 0 else 10
+        # Running totals of this noise level, for the overall accuracy
+        noise_correct = 0
+        noise_total = 0
         
         for perc in observation_percentages:
             plans_dir = f'{join(domain_dir, str(int(perc*100)))}'
@@ -170,7 +334,10 @@ def run_comparison(domain: int, domain_dir: str, source_dir: str,
                 print(f'Warning: Directory {plans_dir} does not exist, skipping...')
                 continue
                 
-            files = os.listdir(plans_dir)
+            # Problem archives only, sorted by name so that runs are reproducible
+            with os.scandir(plans_dir) as it:
+                files = sorted((e for e in it if e.name.endswith(('.zip', '.bz2')) and e.is_file()),
+                               key=lambda e: e.name)
             
             print(f'\nProcessing {len(files)} files at {int(perc*100)}% observations...')
             
@@ -180,7 +347,8 @@ def run_comparison(domain: int, domain_dir: str, source_dir: str,
             if use_noisy_masks:
                 try:
                     mask_file_path = get_mask_path(domain, str(int(perc*100)), noise_level)
-                    mask_data = load_mask_file(mask_file_path)
+                    # apply_mask only reads the noisy observations
+                    mask_data = load_mask_file(mask_file_path, fields=('obs',))
                     print(f'Loaded mask file: {mask_file_path}')
                 except FileNotFoundError:
                     print(f'⚠ Warning: Mask file not found. Skipping this noise level for {int(perc*100)}% observations.')
@@ -190,64 +358,65 @@ def run_comparison(domain: int, domain_dir: str, source_dir: str,
             if skip_problems:
                 continue
             
-            correct = 0
-            total = 0
             skipped = 0
+            perc_results = []
+            # Prepared problems waiting for a batched forward pass
+            pending = []
             
-            for idx, f in enumerate(files):
-                if (idx + 1) % 100 == 0:
-                    print(f'  Processed {idx + 1}/{len(files)} files...')
-                    # Periodic garbage collection to prevent memory buildup
-                    gc.collect()
-                    
-                if f.endswith('.zip'):
-                    unzip_file(join(plans_dir, f), source_dir)
-                elif f.endswith('.bz2'):
-                    unpack_bz2(join(plans_dir, f), source_dir)
-                else:
-                    continue
-                
-                start_time = time.time()
-                
+            # Problems are read and parsed by a thread pool, a bounded number
+            # of files ahead, while the main thread runs the model
+            prefetched = deque()
+            next_file = 0
+            
+            with ThreadPoolExecutor(max_workers=PREPROCESS_WORKERS) as executor:
                 try:
-                    result = run_experiment(
-                        obs_file=join(source_dir, 'obs.dat'),
-                        goals_dict_file=None,
-                        actions_dict_file=None,
-                        possible_goals_file=join(source_dir, 'hyps.dat'),
-                        correct_goal_file=join(source_dir, 'real_hyp.dat'),
-                        domain=domain,
-                        verbose=0,
-                        mask_data=mask_data,
-                        problem_file=f
-                    )
-                    
-                    exec_time = time.time() - start_time
-                    
-                    # Store detailed results
-                    detailed_results.append({
-                        'noise_level': noise,
-                        'observation_percentage': int(perc*100),
-                        'problem_file': f,
-                        'correct_prediction': result[0],
-                        'correct_goal_idx': result[1],
-                        'predicted_goal_idx': result[2],
-                        'execution_time': exec_time
-                    })
-                    
-                    if result[0]:
-                        correct += 1
-                    total += 1
-                    
-                except KeyError:
-                    # Problem not found in mask file - skip it
-                    skipped += 1
-                    if (idx + 1) % 100 == 0:
-                        print(f'  (Skipped {skipped} problems not in mask file)')
-                    continue
-                except Exception as e:
-                    print(f'  Error processing {f}: {e}')
-                    continue
+                    for idx, entry in enumerate(files):
+                        f = entry.name
+                        if (idx + 1) % 100 == 0:
+                            print(f'  Processed {idx + 1}/{len(files)} files...')
+                        if (idx + 1) % GC_INTERVAL == 0:
+                            # Periodic garbage collection to prevent memory buildup
+                            gc.collect()
+                        
+                        while next_file < len(files) and len(prefetched) < PREFETCH_SIZE:
+                            next_entry = files[next_file]
+                            prefetched.append(executor.submit(
+                                preprocess_file, next_entry.path, next_entry.name, domain, mask_data,
+                                goals_dict, actions_dict, parsed_goals.get((perc, next_entry.name))))
+                            next_file += 1
+                        
+                        try:
+                            observations, possible_goals, correct_goal_idx, prepare_time = prefetched.popleft().result()
+                            parsed_goals[(perc, f)] = (possible_goals, correct_goal_idx)
+                        except KeyError:
+                            # Problem not found in mask file - skip it
+                            skipped += 1
+                            if (idx + 1) % 100 == 0:
+                                print(f'  (Skipped {skipped} problems not in mask file)')
+                            continue
+                        except Exception as e:
+                            print(f'  Error processing {f}: {e}')
+                            continue
+                        
+                        pending.append((f, observations, possible_goals, correct_goal_idx, prepare_time))
+                        # The batch holds the only references to its parsed traces
+                        del observations, possible_goals
+                        if len(pending) >= INFERENCE_BATCH_SIZE:
+                            perc_results.extend(run_batch(pending, domain, max_plan_length, noise, int(perc*100)))
+                            pending = []
+                finally:
+                    # On errors or interrupts, drop the problems not started yet
+                    for future in prefetched:
+                        future.cancel()
+            
+            if pending:
+                perc_results.extend(run_batch(pending, domain, max_plan_length, noise, int(perc*100)))
+            
+            detailed_results.extend(perc_results)
+            correct = sum(r['correct_prediction'] for r in perc_results)
+            total = len(perc_results)
+            noise_correct += correct
+            noise_total += total
             
             accuracy = (correct / total) * 100 if total > 0 else 0
             comparison_results[f'{noise}% noise - {int(perc*100)}% obs'] = accuracy
@@ -257,67 +426,59 @@ def run_comparison(domain: int, domain_dir: str, source_dir: str,
             else:
                 print(f'  ✓ Accuracy at {int(perc*100)}% observations: {accuracy:.2f}% ({correct}/{total})')
         
-        overall_accuracy = (sum([r['correct_prediction'] for r in detailed_results if r['noise_level'] == noise]) / 
-                           len([r for r in detailed_results if r['noise_level'] == noise])) * 100
+        overall_accuracy = (noise_correct / noise_total) * 100 if noise_total > 0 else 0
         print(f'\n  Overall accuracy with {noise}% noise: {overall_accuracy:.2f}%')
         
         # Force garbage collection after each noise level
         gc.collect()
     
     # Save results
-    save_results(detailed_results, noise_levels, domain, output_dir)
+    save_results(detailed_results, noise_levels, domain, output_dir, compress_detailed)
     
     return detailed_results
 
 
-def save_results(detailed_results: list, noise_levels: list, domain: int, output_dir: str):
-    """Save results to CSV files."""
+def _summarize(df_detailed: pd.DataFrame, keys: list) -> pd.DataFrame:
+    """Group the detailed results by keys: problem count, correct count, accuracy and mean time."""
+    columns = keys + ['total_problems', 'correct_predictions', 'accuracy', 'avg_execution_time',
+                      'avg_batch_inference_time']
+    if df_detailed.empty:
+        return pd.DataFrame(columns=columns)
+    summary = (df_detailed.groupby(keys, sort=False)
+               .agg(total_problems=('correct_prediction', 'size'),
+                    correct_predictions=('correct_prediction', 'sum'),
+                    accuracy=('correct_prediction', 'mean'),
+                    avg_execution_time=('execution_time', 'mean'),
+                    avg_batch_inference_time=('batch_inference_time', 'mean'))
+               .reset_index())
+    summary['accuracy'] *= 100
+    return summary[columns]
+
+
+def save_results(detailed_results: list, noise_levels: list, domain: int, output_dir: str,
+                 compress_detailed: bool = False):
+    """Save results to CSV files; the detailed one optionally gzip-compressed."""
     
     # Create DataFrame
     df_detailed = pd.DataFrame(detailed_results)
     
-    # Create summary by noise level
-    summary_data = []
-    for noise in noise_levels:
-        noise_results = [r for r in detailed_results if r['noise_level'] == noise]
-        if noise_results:
-            summary_data.append({
-                'noise_level': noise,
-                'total_problems': len(noise_results),
-                'correct_predictions': sum([r['correct_prediction'] for r in noise_results]),
-                'accuracy': (sum([r['correct_prediction'] for r in noise_results]) / len(noise_results)) * 100,
-                'avg_execution_time': np.mean([r['execution_time'] for r in noise_results])
-            })
-    
-    df_summary = pd.DataFrame(summary_data)
-    
-    # Create summary by noise level AND observation percentage
-    summary_by_perc_data = []
-    for noise in noise_levels:
-        for perc in [10, 30, 50, 70, 100]:
-            perc_results = [r for r in detailed_results if r['noise_level'] == noise and r['observation_percentage'] == perc]
-            if perc_results:
-                summary_by_perc_data.append({
-                    'noise_level': noise,
-                    'observation_percentage': perc,
-                    'total_problems': len(perc_results),
-                    'correct_predictions': sum([r['correct_prediction'] for r in perc_results]),
-                    'accuracy': (sum([r['correct_prediction'] for r in perc_results]) / len(perc_results)) * 100,
-                    'avg_execution_time': np.mean([r['execution_time'] for r in perc_results])
-                })
-    
-    df_summary_by_perc = pd.DataFrame(summary_by_perc_data)
+    # Summary by noise level, and by noise level AND observation percentage
+    df_summary = _summarize(df_detailed, ['noise_level'])
+    df_summary_by_perc = _summarize(df_detailed, ['noise_level', 'observation_percentage'])
     
     # Generate filenames
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    domain_name = get_domain_related(domain, C.MODEL_FILE).split('_')[0]
+    domain_name = get_domain_name(domain)
     
     detailed_filename = join(output_dir, f'results_{domain_name}_detailed_{timestamp}.csv')
+    if compress_detailed:
+        detailed_filename += '.gz'
     summary_filename = join(output_dir, f'results_{domain_name}_summary_{timestamp}.csv')
     summary_by_perc_filename = join(output_dir, f'results_{domain_name}_summary_by_perc_{timestamp}.csv')
     
     # Save files
-    df_detailed.to_csv(detailed_filename, index=False)
+    # Compression is inferred from the .gz extension; rows are written in chunks
+    df_detailed.to_csv(detailed_filename, index=False, chunksize=4096)
     df_summary.to_csv(summary_filename, index=False)
     df_summary_by_perc.to_csv(summary_by_perc_filename, index=False)
     
@@ -382,15 +543,22 @@ Examples:
     parser.add_argument('--obs-percentages', type=int, nargs='+', default=[10, 30, 50, 70, 100],
                         help='Observation percentages to test (default: 10 30 50 70 100)')
     
-    parser.add_argument('--source-dir', type=str, default='./tmp',
-                        help='Temporary directory for unpacking files (default: ./tmp)')
-    
     parser.add_argument('--model-type', type=str, default='small',
                         choices=['small', 'complete'],
                         help='Model type to use (default: small)')
     
+    parser.add_argument('--gzip-detailed', action='store_true',
+                        help='Write the detailed results as a gzip-compressed .csv.gz file')
+    
+    parser.add_argument('--mixed-precision', action='store_true',
+                        help='Run the Keras models with float16 computations (GPU only)')
+    
     args = parser.parse_args()
     
+    # The file loop allocates many short-lived lists: collect the young
+    # generation less often, the periodic gc.collect() handles the rest
+    gc.set_threshold(50000, 10, 10)
+    
     # Handle "all" domains
     if 'all' in args.domains:
         domains_to_test = ['blocksworld', 'logistics', 'satellite', 'zenotravel', 'driverlog', 'depots']
@@ -406,9 +574,6 @@ Examples:
     # Create output directory if needed
     os.makedirs(args.output_dir, exist_ok=True)
     
-    # Create source directory if needed
-    os.makedirs(args.source_dir, exist_ok=True)
-    
     print(f'{"="*60}')
     print(f'NOISY GOAL RECOGNITION COMPARISON')
     print(f'{"="*60}')
@@ -418,6 +583,8 @@ Examples:
     print(f'Noise levels: {args.noise_levels}')
     print(f'Observation percentages: {args.obs_percentages}%')
     print(f'Model type: {args.model_type}')
+    if args.mixed_precision:
+        print('Mixed precision: float16')
     
     # Determine model type
     model_type = C.SMALL if args.model_type == 'small' else C.COMPLETE
@@ -451,17 +618,18 @@ Examples:
             print(f'\n{"="*60}')
             print(f'LOADING MODEL FOR {domain_name.upper()}')
             print(f'{"="*60}')
-            load_single_model(domain=domain, model_type=model_type, percentage=0)
+            load_single_model(domain=domain, model_type=model_type, percentage=0,
+                              mixed_precision=args.mixed_precision)
             
             # Run comparison
             start_time = time.time()
             run_comparison(
                 domain=domain,
                 domain_dir=domain_dir,
-                source_dir=args.source_dir,
                 noise_levels=args.noise_levels,
                 observation_percentages=obs_percentages,
-                output_dir=args.output_dir
+                output_dir=args.output_dir,
+                compress_detailed=args.gzip_detailed
             )
             
             elapsed_time = time.time() - start_time
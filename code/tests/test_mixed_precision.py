@@ -0,0 +1,46 @@
+"""Forward pass of the attention layers after to_mixed_precision."""
+
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip('numpy')
+tf = pytest.importorskip('tensorflow')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from GRNet_approach_functions import (  # noqa: E402
+    AttentionWeights, ContextVector, AttentionPool, to_mixed_precision
+)
+
+MAX_PLAN_LENGTH = 6
+VOCABULARY_SIZE = 20
+N_FLUENTS = 5
+
+
+def _build_model() -> tf.keras.Model:
+    """Small GRNet-like model with both attention blocks."""
+    inputs = tf.keras.layers.Input(shape=(MAX_PLAN_LENGTH,))
+    embedded = tf.keras.layers.Embedding(VOCABULARY_SIZE, 8)(inputs)
+    hidden = tf.keras.layers.LSTM(8, return_sequences=True)(embedded)
+    weights = AttentionWeights(MAX_PLAN_LENGTH)(hidden)
+    context = ContextVector()([hidden, weights])
+    pooled = AttentionPool(MAX_PLAN_LENGTH)(hidden)
+    merged = tf.keras.layers.Concatenate()([context, pooled])
+    outputs = tf.keras.layers.Dense(N_FLUENTS, activation='sigmoid')(merged)
+    return tf.keras.Model(inputs, outputs)
+
+
+def test_mixed_precision_forward_pass():
+    model = _build_model()
+    mixed_model = to_mixed_precision(model)
+
+    model_input = np.random.default_rng(0).integers(
+        0, VOCABULARY_SIZE, size=(3, MAX_PLAN_LENGTH)).astype(np.float32)
+    expected = model(model_input, training=False).numpy()
+    predictions = mixed_model(model_input, training=False)
+
+    assert predictions.dtype == tf.float32
+    assert predictions.shape == (3, N_FLUENTS)
+    np.testing.assert_allclose(predictions.numpy(), expected, atol=1e-2)
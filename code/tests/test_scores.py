@@ -0,0 +1,25 @@
+"""get_scores against the per-goal sum, including empty goals."""
+
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('tensorflow')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from GRNet_approach_functions import get_scores  # noqa: E402
+
+
+@pytest.mark.parametrize('possible_goals', [
+    [[0, 2], [1], [3, 4, 0]],
+    [[0, 2], [], [3]],
+    [[1], [2, 3], []],
+    [[], []],
+])
+def test_get_scores_matches_per_goal_sum(possible_goals):
+    prediction = np.array([[0.1, 0.2, 0.3, 0.4, 0.5]])
+    expected = [sum(prediction[0][i] for i in goal) for goal in possible_goals]
+    np.testing.assert_allclose(get_scores(prediction, possible_goals), expected)
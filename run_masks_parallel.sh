@@ -2,6 +2,8 @@
 # Launch mask generation workers in parallel (one process per domain).
 # Each worker will run the adversarial generator for all hole percentages and attack percentages,
 # but for a single domain. Logs and PIDs are saved under ./logs.
+# Each worker runs its own process pool: the available cores are split across the domains
+# (override with WORKERS_PER_DOMAIN).
 
 set -eu
 
@@ -12,25 +14,27 @@ ATTACK_LEVELS=(5 10 15 20 30)
 LOG_DIR=./logs/mask_generation
 PIDS_DIR=./logs/pids
 WORKER_SCRIPT=adversarial_gen/code/run_masks_worker.py
-TMP_BASE_DIR=./tmp
+TOTAL_CORES=$(nproc)
+WORKERS_PER_DOMAIN=${WORKERS_PER_DOMAIN:-$(( TOTAL_CORES / ${#DOMAINS[@]} ))}
+if [ "$WORKERS_PER_DOMAIN" -lt 1 ]; then
+    WORKERS_PER_DOMAIN=1
+fi
 
 mkdir -p "$LOG_DIR"
 mkdir -p "$PIDS_DIR"
 
 echo "Starting mask workers (one per domain): ${DOMAINS[*]}"
 echo "Attack levels to generate: ${ATTACK_LEVELS[*]}"
+echo "Worker processes per domain: $WORKERS_PER_DOMAIN ($TOTAL_CORES cores)"
 
-worker_idx=1
 for domain in "${DOMAINS[@]}"; do
     LOG_FILE="$LOG_DIR/mask_${domain}.log"
     PID_FILE="$PIDS_DIR/mask_${domain}.pid"
-    TMP_DIR="${TMP_BASE_DIR}${worker_idx}"
 
     if [ -f "$PID_FILE" ]; then
         oldpid=$(cat "$PID_FILE")
         if [ -n "$oldpid" ] && kill -0 "$oldpid" 2>/dev/null; then
             echo "Worker for domain $domain already running (pid=$oldpid). Skipping start."
-            ((worker_idx++))
             continue
         else
             echo "Removing stale PID file $PID_FILE"
@@ -38,28 +42,18 @@ for domain in "${DOMAINS[@]}"; do
         fi
     fi
 
-    # Create unique temp directory for this worker
-    mkdir -p "$TMP_DIR"
-
-    echo "Launching worker for domain $domain (tmp: $TMP_DIR, logs: $LOG_FILE)"
+    echo "Launching worker for domain $domain (logs: $LOG_FILE)"
     # Convert ATTACK_LEVELS array to space-separated string for arguments
     attack_args="${ATTACK_LEVELS[*]}"
-    nohup "$PYTHON" "$WORKER_SCRIPT" --domains "$domain" --attacks $attack_args --tmp-dir "$TMP_DIR" < /dev/null > "$LOG_FILE" 2>&1 &
+    nohup "$PYTHON" "$WORKER_SCRIPT" --domains "$domain" --attacks $attack_args --workers "$WORKERS_PER_DOMAIN" < /dev/null > "$LOG_FILE" 2>&1 &
     pid=$!
     echo "$pid" > "$PID_FILE"
     disown "$pid" 2>/dev/null || true
-    echo "  started pid=$pid (detached, using $TMP_DIR)"
-    
-    ((worker_idx++))
+    echo "  started pid=$pid (detached)"
 done
 
 echo ""
-echo "All workers launched. Each worker uses its own temp directory:"
-worker_idx=1
-for domain in "${DOMAINS[@]}"; do
-    echo "  Worker $domain: ${TMP_BASE_DIR}${worker_idx}"
-    ((worker_idx++))
-done
+echo "All workers launched."
 
 echo ""
 echo "To follow logs:"